@@ -1,48 +1,263 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, stream_with_context, g
 from flask_cors import CORS
-import json
 import sys
 import os
 from datetime import datetime
 import threading
 import time
+import importlib.util
+import hmac
+import queue
+import contextvars
+from contextlib import contextmanager
+
+# Add current directory to Python path to import webscraper
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from json_provider import FastJSONProvider, encode_json, json_bytes_response, USE_ORJSON
+from http_cache import compute_etag, versioned_html, apply_static_caching, STATIC_MAX_AGE
+from compression import StaticAssetStore, compress_response, SUPPORTED_ENCODINGS
+from rate_limiter import scrape_priority, PRIORITY_BACKGROUND
+from image_proxy import ThumbnailCache, ImageProxyError, ALLOWED_IMAGE_HOSTS, DEFAULT_WIDTH
+from autotune import Overloaded
+from bulk_jobs import BulkJobStore, BulkJobRunner, JobNotFound, MAX_QUERIES_PER_JOB, FINAL_STATUSES
+from deadlines import request_deadline, parse_timeout, DeadlineExceeded
+from memory_profile import MemoryReporter
+from request_profiler import RequestProfiler
+from price_index import PriceIndex, parse_price_range
+# Scraping, result caches and ranking are shared with webscraper.py and the CLI demo
+from search_service import (
+    WEBSCRAPER_AVAILABLE, CACHE_TIMEOUT, scraper, search_cache, ranked_results, cache_stats, catalog,
+    price_history, refresh_scheduler, encoded_body, make_cache_key, adopt_shared_result,
+    normalize_search_params, search_for_mode, run_search, start_services
+)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)  # orjson-backed when available (JSON_PROVIDER=stdlib to disable)
 CORS(app)  # Enable CORS for frontend-backend communication
 
-# Add current directory to Python path to import webscraper
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# The questioner is imported on first use; a preloaded master warms it once instead
+QUESTIONER_AVAILABLE = importlib.util.find_spec('product_questions') is not None
 
-# Import the enhanced webscraper functions
-try:
-    from webscraper_fixed import scrape_all_platforms, premiummax, budgetbalance, persona_debate
-    from product_questions import ProductQuestioner
-    WEBSCRAPER_AVAILABLE = True
-    QUESTIONER_AVAILABLE = True
-    print("✅ Successfully imported enhanced webscraper functions")
-    print("✅ Successfully imported product questioner")
-except ImportError as e:
-    WEBSCRAPER_AVAILABLE = False
-    QUESTIONER_AVAILABLE = False
-    print(f"⚠️ Warning: Could not import webscraper functions: {e}")
-    print("Using mock data for demonstration")
-
-# Simple cache implementation
-search_cache = {}
-CACHE_TIMEOUT = 300  # 5 minutes
+# Directory that static files are served from
+STATIC_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# CSS/JS/HTML are read and precompressed once per worker, then served from memory
+static_assets = StaticAssetStore(STATIC_ROOT)
+static_assets.load()
 
 # Product questioner instances
 questioner_sessions = {}
 
+# Product image proxy with a bounded on-disk thumbnail cache; IMAGE_CACHE_DIR= disables it
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', os.path.join(STATIC_ROOT, 'instance', 'thumbnails'))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+IMAGE_PROXY_HOSTS = ALLOWED_IMAGE_HOSTS + tuple(
+    h.strip() for h in os.environ.get('IMAGE_PROXY_HOSTS', '').split(',') if h.strip()
+)
+try:
+    thumbnail_cache = (ThumbnailCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES, allowed_hosts=IMAGE_PROXY_HOSTS)
+                       if IMAGE_CACHE_DIR else None)
+except Exception as e:
+    thumbnail_cache = None
+    print(f"⚠️ Warning: Image proxy unavailable: {e}")
+
+# Batch search jobs (POST /api/jobs); BULK_JOBS_DIR= disables them
+BULK_JOBS_DIR = os.environ.get('BULK_JOBS_DIR', os.path.join(STATIC_ROOT, 'instance', 'jobs'))
+BULK_CONCURRENCY = int(os.environ.get('BULK_CONCURRENCY', 2))  # queries in flight per worker
+try:
+    bulk_jobs = BulkJobStore(BULK_JOBS_DIR) if BULK_JOBS_DIR else None
+except Exception as e:
+    bulk_jobs = None
+    print(f"⚠️ Warning: Bulk jobs unavailable: {e}")
+
+# When a worker is saturated, results up to this old are served instead of scraping (else 503)
+STALE_MAX_AGE = int(os.environ.get('STALE_MAX_AGE', 24 * 3600))
+OVERLOAD_RETRY_AFTER = 5  # seconds
+
+# End-to-end budget for a search (X-Request-Timeout header or "timeout" field, in seconds);
+# gunicorn.conf.py caps MAX_REQUEST_TIMEOUT below the worker timeout
+DEFAULT_REQUEST_TIMEOUT = float(os.environ.get('DEFAULT_REQUEST_TIMEOUT', 25))
+MAX_REQUEST_TIMEOUT = float(os.environ.get('MAX_REQUEST_TIMEOUT', 60))
+
+# Data files under these directories are never served as static files
+PRIVATE_DIRS = ('instance',)
+
+# /api/admin/* endpoints require an X-Admin-Token header equal to ADMIN_TOKEN (unset disables them)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+# Per-worker memory footprint of the in-process caches (GET /api/admin/memory).
+# MEMORY_TRACE_FRAMES > 0 starts tracemalloc with that many frames to report allocation sites;
+# MEMORY_LOG_INTERVAL > 0 logs a summary every that many seconds
+memory_reporter = MemoryReporter({
+    'search_cache': (search_cache, {
+        'responses': lambda entry: entry['data'],
+        'encoded_bodies': lambda entry: entry['encoded']
+    }),
+    'ranked_results': (ranked_results, {'products': lambda entry: entry['results']}),
+    'questioner_sessions': (questioner_sessions, None)
+}, trace_frames=int(os.environ.get('MEMORY_TRACE_FRAMES', 0)),
+   log_interval=int(os.environ.get('MEMORY_LOG_INTERVAL', 0)))
+
+def admin_authorized():
+    """True when the request carries the configured admin token"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+# Sampled /api/scrape profiles: 1 in PROFILE_SAMPLE_RATE searches (0 = only requests sending
+# X-Profile: 1 with the admin token) are stack-sampled; the last PROFILE_KEEP are kept in PROFILE_DIR
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(STATIC_ROOT, 'instance', 'profiles'))
+try:
+    request_profiler = RequestProfiler(
+        PROFILE_DIR, sample_rate=int(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+        keep=int(os.environ.get('PROFILE_KEEP', 20)),
+        interval=float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000
+    ) if PROFILE_DIR else None
+except Exception as e:
+    request_profiler = None
+    print(f"⚠️ Warning: Request profiler unavailable: {e}")
+
+@contextmanager
+def profile_scope(search):
+    """Profile the enclosed search when it is sampled or an admin asked for it (X-Profile: 1)"""
+    forced = request.headers.get('X-Profile') == '1' and admin_authorized()
+    if request_profiler is None or not request_profiler.should_profile(forced):
+        yield None
+        return
+    with request_profiler.profile(f"{request.method} /api/scrape {search['search_query']}") as profile:
+        g.profile_id = profile.id
+        yield profile
+
+
+def cached_json_response(entry, product_refs='inline'):
+    """Serve a cache entry without re-serializing it"""
+    body, etag = encoded_body(entry, product_refs)
+    response = json_bytes_response(body)
+    response.set_etag(etag)
+    return response
+
+def conditional_json_response(entry, product_refs='inline'):
+    """Serve a cache entry with HTTP caching headers, answering 304 when the client copy is current"""
+    response = cached_json_response(entry, product_refs)
+    if entry['cacheable']:
+        remaining = int(CACHE_TIMEOUT - (time.time() - entry['timestamp']))
+        response.cache_control.public = True
+        response.cache_control.max_age = max(remaining, 0)
+        response.last_modified = entry['timestamp']
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def request_timeout(params):
+    """Seconds this request may take, from the X-Request-Timeout header or a "timeout" field"""
+    return parse_timeout(request.headers.get('X-Request-Timeout') or params.get('timeout'),
+                         DEFAULT_REQUEST_TIMEOUT, MAX_REQUEST_TIMEOUT)
+
+def fallback_response(search, status, message):
+    """Answer a search that cannot be scraped now with its last known result, else an error status"""
+    cache_key = make_cache_key(search['search_query'], search['preference'], search['max_results'],
+                               search['positions'], search['price_range'])
+    entry = search_cache.get(cache_key) or adopt_shared_result(cache_key, STALE_MAX_AGE)
+    if entry is not None and time.time() - entry['timestamp'] < STALE_MAX_AGE:
+        print(f"🚦 {message} - serving stale result: {search['search_query']}")
+        response = cached_json_response(entry, search['product_refs'])
+        response.headers['X-Served-From'] = 'stale-cache'
+        response.cache_control.no_cache = True
+        return response
+
+    response = jsonify({
+        'error': message,
+        'retry_after': OVERLOAD_RETRY_AFTER,
+        'timestamp': datetime.now().isoformat()
+    })
+    response.status_code = status
+    response.headers['Retry-After'] = str(OVERLOAD_RETRY_AFTER)
+    return response
+
+
+def run_bulk_query(search_query, params):
+    """One query of a bulk job: the /api/scrape pipeline at background priority"""
+    search_query = ' '.join(str(search_query).split())
+    # Stored in job.json, so the (min, max) tuple comes back as a list
+    price_range = tuple(params['price_range']) if params.get('price_range') else None
+    for attempt in range(10):
+        try:
+            # Queued behind interactive scrapes for the same retailer
+            with scrape_priority(PRIORITY_BACKGROUND):
+                entry = run_search(search_query, params['max_results'], params['preference'], params['platforms'],
+                                   price_range=price_range)
+            break
+        except Overloaded:
+            time.sleep(OVERLOAD_RETRY_AFTER * (attempt + 1))
+    else:
+        raise Overloaded('Worker stayed saturated')
+
+    data = entry['data']
+    result = {
+        'total_results': data.get('total_results', len(data.get('data') or [])),
+        'final_recommendation': data.get('final_recommendation'),
+        'premium_recommendations': data.get('premium_recommendations', []),
+        'budget_recommendations': data.get('budget_recommendations', []),
+        'source': data.get('source')
+    }
+    if params.get('include_products'):
+        result['products'] = data.get('data') or []
+    return result
+
+bulk_job_runner = (BulkJobRunner(bulk_jobs, run_bulk_query, concurrency=BULK_CONCURRENCY)
+                   if bulk_jobs is not None else None)
+
+def start_worker_services():
+    """Start per-worker background threads (threads do not survive gunicorn's fork)"""
+    start_services()
+    if bulk_job_runner is not None:
+        bulk_job_runner.start()
+    memory_reporter.start()
+
+def warm_shared_state():
+    """Import and build everything workers share, so forked workers inherit it ready-made"""
+    started = time.perf_counter()
+    if WEBSCRAPER_AVAILABLE:
+        scraper()  # compiles the CSS selectors and imports requests/bs4/lxml
+    if QUESTIONER_AVAILABLE:
+        from product_questions import ProductQuestioner
+        ProductQuestioner().generate_question_flow('electronics')
+    print(f"🔥 Preloaded shared state in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+# gunicorn.conf.py sets GUNICORN_PRELOAD=1 and starts worker services in post_fork
+if os.environ.get('GUNICORN_PRELOAD') == '1':
+    warm_shared_state()
+else:
+    start_worker_services()
+
+@app.after_request
+def compress_api_response(response):
+    """Negotiated gzip/brotli compression for JSON and HTML responses"""
+    if 'profile_id' in g:
+        response.headers['X-Profile-Id'] = g.profile_id
+    return compress_response(response, request)
+
 @app.route('/')
 def serve_frontend():
-    """Serve the main frontend page"""
-    return send_from_directory('.', 'enhanced-index.html')
+    """Serve the main frontend page with fingerprinted asset URLs"""
+    html = versioned_html(STATIC_ROOT, 'enhanced-index.html')
+    response = app.response_class(html, mimetype='text/html')
+    response.set_etag(compute_etag(html))
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/<path:path>')
 def serve_static(path):
     """Serve static files (CSS, JS)"""
-    return send_from_directory('.', path)
+    if os.path.normpath(path).replace('\\', '/').split('/', 1)[0] in PRIVATE_DIRS:
+        return not_found(None)
+    asset = static_assets.get(path)
+    if asset:
+        response = static_assets.response(asset, request, app.response_class)
+    else:
+        response = send_from_directory('.', path)
+    return apply_static_caching(response, STATIC_ROOT, path, request.args.get('v'))
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -52,7 +267,18 @@ def health_check():
         'backend_available': WEBSCRAPER_AVAILABLE,
         'timestamp': datetime.now().isoformat(),
         'message': 'Enhanced AI Shopping Assistant Backend is running',
-        'features': ['multi-platform', 'caching', 'enhanced-scraping']
+        'features': ['multi-platform', 'caching', 'enhanced-scraping', 'http-caching', 'compression',
+                     'search-stream'],
+        'compression': SUPPORTED_ENCODINGS,
+        'catalog': catalog.stats() if catalog is not None else None,
+        'image_cache': thumbnail_cache.stats() if thumbnail_cache is not None else None,
+        'refresh_scheduler': refresh_scheduler.stats() if refresh_scheduler is not None else None,
+        'bulk_jobs': bulk_job_runner.stats() if bulk_job_runner is not None else None,
+        'rate_limits': scraper().RATE_LIMITER.stats() if 'webscraper_fixed' in sys.modules else None,
+        'autotune': scraper().AUTOTUNER.stats() if 'webscraper_fixed' in sys.modules else None,
+        'parse_pool': scraper().PARSE_POOL.stats() if 'webscraper_fixed' in sys.modules else None,
+        'search_cache': cache_stats.stats(),
+        'json_provider': 'orjson' if USE_ORJSON else 'stdlib'
     })
 
 @app.route('/api/scrape', methods=['POST'])
@@ -61,96 +287,31 @@ def scrape_products():
     try:
         data = request.get_json()
         
-        if not data or 'search_query' not in data:
+        if not data or ('search_query' not in data and 'cursor' not in data):
             return jsonify({'error': 'Search query is required'}), 400
         
-        search_query = data['search_query'].strip()
-        max_results = data.get('max_results', 12)
-        preference = data.get('preference', 'neutral')
-        platforms = data.get('platforms', ['amazon', 'flipkart', 'myntra'])
+        try:
+            search = normalize_search_params(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if not search_query:
+        if not search['search_query']:
             return jsonify({'error': 'Search query cannot be empty'}), 400
         
-        # Check cache first
-        cache_key = f"{search_query}_{preference}_{max_results}"
-        if cache_key in search_cache and time.time() - search_cache[cache_key]['timestamp'] < CACHE_TIMEOUT:
-            cached_data = search_cache[cache_key]['data']
-            print(f"📦 Serving from cache: {search_query}")
-            return jsonify(cached_data)
-        
-        if WEBSCRAPER_AVAILABLE:
-            try:
-                # Use the enhanced multi-platform scraper
-                results = scrape_all_platforms(search_query, max_results)
-                
-                if not results:
-                    response_data = {
-                        'success': True,
-                        'data': [],
-                        'message': 'No products found for your search across all platforms',
-                        'timestamp': datetime.now().isoformat(),
-                        'platforms_searched': platforms
-                    }
-                    search_cache[cache_key] = {
-                        'data': response_data,
-                        'timestamp': time.time()
-                    }
-                    return jsonify(response_data)
-                
-                # Get persona recommendations
-                pm_recs = premiummax(results, 4)
-                bb_recs = budgetbalance(results, 4)
-                
-                # Get final recommendation based on preference
-                final_rec = persona_debate(results, preference)
-                
-                # Prepare platform statistics
-                platform_stats = {}
-                for product in results:
-                    platform = product['platform']
-                    platform_stats[platform] = platform_stats.get(platform, 0) + 1
-                
-                response_data = {
-                    'success': True,
-                    'data': results,
-                    'premium_recommendations': pm_recs,
-                    'budget_recommendations': bb_recs,
-                    'final_recommendation': final_rec,
-                    'preference': preference,
-                    'timestamp': datetime.now().isoformat(),
-                    'platform_stats': platform_stats,
-                    'total_results': len(results),
-                    'source': 'Multi-Platform (Amazon, Flipkart, Myntra)'
-                }
-                
-                # Cache the results
-                search_cache[cache_key] = {
-                    'data': response_data,
-                    'timestamp': time.time()
-                }
-                
-                return jsonify(response_data)
-                
-            except Exception as e:
-                return jsonify({
-                    'error': f'Scraping failed: {str(e)}',
-                    'timestamp': datetime.now().isoformat()
-                }), 500
-        else:
-            # Fallback to enhanced mock data
-            mock_data = generate_enhanced_mock_data(search_query, max_results, platforms)
+        try:
+            with request_deadline(request_timeout(data)), profile_scope(search):
+                entry = search_for_mode(search)
+        except Overloaded:
+            return fallback_response(search, 503, 'Server is busy, please retry shortly')
+        except DeadlineExceeded:
+            return fallback_response(search, 504, 'Request deadline passed before results were ready')
+        except Exception as e:
             return jsonify({
-                'success': True,
-                'data': mock_data,
-                'premium_recommendations': mock_data[:4],
-                'budget_recommendations': mock_data[-4:],
-                'final_recommendation': mock_data[0],
-                'preference': preference,
-                'timestamp': datetime.now().isoformat(),
-                'source': 'mock_data',
-                'note': 'webscraper.py not available - using enhanced mock data'
-            })
+                'error': f'Scraping failed: {str(e)}',
+                'timestamp': datetime.now().isoformat()
+            }), 500
+        
+        return cached_json_response(entry, search['product_refs'])
             
     except Exception as e:
         return jsonify({
@@ -158,34 +319,238 @@ def scrape_products():
             'timestamp': datetime.now().isoformat()
         }), 500
 
-def generate_enhanced_mock_data(search_query, max_results, platforms):
-    """Generate enhanced mock product data with multiple platforms"""
-    products = []
-    platforms_info = {
-        'amazon': {'icon': '📦', 'base_price': 1000},
-        'flipkart': {'icon': '🛒', 'base_price': 800},
-        'myntra': {'icon': '👕', 'base_price': 1200}
-    }
-    
-    for i in range(max_results):
-        platform = list(platforms_info.keys())[i % len(platforms_info)]
-        platform_data = platforms_info[platform]
+@app.route('/api/scrape', methods=['GET'])
+def scrape_products_cacheable():
+    """Cacheable GET variant of /api/scrape (?search_query=...&preference=...&max_results=...)"""
+    try:
+        try:
+            search = normalize_search_params(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        price = platform_data['base_price'] + (i * 300)
-        rating = max(3.0, min(5.0, 4.0 + (i * 0.1)))
+        if not search['search_query']:
+            return jsonify({'error': 'Search query is required'}), 400
         
-        product = {
-            'title': f'{search_query.capitalize()} {platform.capitalize()} Edition {i+1}',
-            'price': price,
-            'rating': round(rating, 1),
-            'url': f'https://www.{platform}.com/search?q={search_query.replace(" ", "+")}',
-            'image': f'https://picsum.photos/300/400?random={i+100}',
-            'platform': platform.capitalize(),
-            'platform_icon': platform_data['icon']
-        }
-        products.append(product)
-    
-    return products
+        try:
+            with request_deadline(request_timeout(request.args)), profile_scope(search):
+                entry = search_for_mode(search)
+        except Overloaded:
+            return fallback_response(search, 503, 'Server is busy, please retry shortly')
+        except DeadlineExceeded:
+            return fallback_response(search, 504, 'Request deadline passed before results were ready')
+        except Exception as e:
+            return jsonify({
+                'error': f'Scraping failed: {str(e)}',
+                'timestamp': datetime.now().isoformat()
+            }), 500
+        
+        return conditional_json_response(entry, search['product_refs'])
+            
+    except Exception as e:
+        return jsonify({
+            'error': f'Internal server error: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/api/scrape/stream', methods=['GET'])
+def scrape_products_stream():
+    """/api/scrape as NDJSON: a "platform" line as each retailer finishes, then the "result" line
+
+    Same parameters as GET /api/scrape. Platform lines carry that platform's raw products so a
+    client can render early; the result line is the full /api/scrape payload (merged and ranked).
+    """
+    try:
+        search = normalize_search_params(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not search['search_query']:
+        return jsonify({'error': 'Search query is required'}), 400
+    timeout = request_timeout(request.args)
+    events = queue.Queue()
+
+    def run():
+        if WEBSCRAPER_AVAILABLE:
+            scraper().result_listener.set(lambda platform, products: events.put(
+                {'type': 'platform', 'platform': platform, 'products': products}))
+        try:
+            with request_deadline(timeout):
+                entry = search_for_mode(search)
+            events.put({'type': 'result', **entry['data']})
+        except Overloaded:
+            events.put({'type': 'error', 'status': 503, 'error': 'Server is busy, please retry shortly',
+                        'retry_after': OVERLOAD_RETRY_AFTER})
+        except DeadlineExceeded:
+            events.put({'type': 'error', 'status': 504, 'error': 'Request deadline passed before results were ready'})
+        except Exception as e:
+            events.put({'type': 'error', 'status': 500, 'error': f'Scraping failed: {str(e)}'})
+        finally:
+            events.put(None)
+
+    # The search keeps going if the client disconnects, so its result still lands in the cache
+    threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True).start()
+
+    def generate():
+        while True:
+            event = events.get()
+            if event is None:
+                return
+            yield encode_json(event) + b'\n'
+
+    response = app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.cache_control.no_cache = True
+    return response
+
+
+@app.route('/api/price-history', methods=['GET'])
+def get_price_history():
+    """Price/rating observations for a product URL (?url=...&start=...&end=... in unix seconds)"""
+    url = request.args.get('url', '').strip()
+    if not url:
+        return jsonify({'error': 'Product url is required'}), 400
+    if price_history is None:
+        return jsonify({'error': 'Price history is disabled'}), 503
+
+    try:
+        start = float(request.args['start']) if request.args.get('start') else None
+        end = float(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be unix timestamps'}), 400
+
+    points = price_history.query(url, start, end)
+    prices = [p['price'] for p in points if p['price'] > 0]
+    return jsonify({
+        'success': True,
+        'url': url,
+        'points': points,
+        'summary': {
+            'count': len(points),
+            'min_price': min(prices) if prices else None,
+            'max_price': max(prices) if prices else None,
+            'latest_price': prices[-1] if prices else None,
+            'change': round(prices[-1] - prices[0], 2) if len(prices) > 1 else 0
+        },
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/image', methods=['GET'])
+def proxy_image():
+    """Resized, cached product image (?url=...&w=240)"""
+    if thumbnail_cache is None:
+        return jsonify({'error': 'Image proxy is disabled'}), 503
+
+    url = request.args.get('url', '').strip()
+    if not url:
+        return jsonify({'error': 'Image url is required'}), 400
+    try:
+        width = int(request.args.get('w', DEFAULT_WIDTH))
+    except ValueError:
+        return jsonify({'error': 'Width must be a number'}), 400
+
+    try:
+        data, mimetype, etag = thumbnail_cache.get(url, width)
+    except ImageProxyError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Image fetch failed: {str(e)}'}), 502
+
+    # Thumbnails for a given source URL and width never change
+    response = app.response_class(data, mimetype=mimetype)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = STATIC_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_bulk_job():
+    """Queue a batch of searches: {"queries": [...], "preference", "max_results", "platforms", "include_products",
+    "min_price"/"max_price"/"budget_range"}"""
+    if bulk_jobs is None:
+        return jsonify({'error': 'Bulk jobs are disabled'}), 503
+
+    data = request.get_json(silent=True) or {}
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries:
+        return jsonify({'error': 'queries must be a non-empty list'}), 400
+    queries = [str(q).strip() for q in queries if str(q).strip()]
+    if not queries:
+        return jsonify({'error': 'queries must be a non-empty list'}), 400
+    if len(queries) > MAX_QUERIES_PER_JOB:
+        return jsonify({'error': f'At most {MAX_QUERIES_PER_JOB} queries per job'}), 400
+
+    try:
+        search = normalize_search_params({**data, 'search_query': queries[0], 'cursor': None})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    params = {
+        'preference': search['preference'],
+        'max_results': search['max_results'],
+        'platforms': search['platforms'],
+        'price_range': search['price_range'],
+        'include_products': bool(data.get('include_products'))
+    }
+    job_id = bulk_jobs.create(queries, params)
+    if bulk_job_runner is not None:
+        bulk_job_runner.notify()
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'total': len(queries),
+        'status_url': f'/api/jobs/{job_id}',
+        'results_url': f'/api/jobs/{job_id}/results'
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_bulk_job(job_id):
+    """Progress of a bulk job"""
+    if bulk_jobs is None:
+        return jsonify({'error': 'Bulk jobs are disabled'}), 503
+    try:
+        return jsonify({'success': True, **bulk_jobs.progress(job_id)})
+    except JobNotFound:
+        return jsonify({'error': 'Job not found'}), 404
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_bulk_job(job_id):
+    """Stop a bulk job; results already produced stay available"""
+    if bulk_jobs is None:
+        return jsonify({'error': 'Bulk jobs are disabled'}), 503
+    try:
+        job = bulk_jobs.set_status(job_id, 'cancelled')
+    except JobNotFound:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'id': job_id, 'status': job['status']})
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def stream_bulk_job_results(job_id):
+    """Finished results as NDJSON (?offset=N skips lines, ?follow=1 streams until the job ends)"""
+    if bulk_jobs is None:
+        return jsonify({'error': 'Bulk jobs are disabled'}), 503
+    try:
+        bulk_jobs.load(job_id)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except JobNotFound:
+        return jsonify({'error': 'Job not found'}), 404
+    except ValueError:
+        return jsonify({'error': 'offset must be a number'}), 400
+    follow = request.args.get('follow') == '1'
+
+    def generate():
+        sent = offset
+        while True:
+            for line in bulk_jobs.result_lines(job_id, sent):
+                sent += 1
+                yield line
+            if not follow or bulk_jobs.load(job_id)['status'] in FINAL_STATUSES:
+                # Lines written between the last read and the status change
+                for line in bulk_jobs.result_lines(job_id, sent):
+                    yield line
+                return
+            time.sleep(1)
+
+    response = app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.cache_control.no_cache = True
+    return response
 
 @app.route('/api/platforms', methods=['GET'])
 def get_platforms():
@@ -201,8 +566,39 @@ def get_platforms():
 def clear_cache():
     """Clear the search cache"""
     search_cache.clear()
+    ranked_results.clear()
     return jsonify({'success': True, 'message': 'Cache cleared', 'cache_size': 0})
 
+@app.route('/api/admin/memory', methods=['GET'])
+def memory_report():
+    """Entry counts, approximate deep sizes and allocation sites of this worker's caches
+
+    ?sites=0 skips the process-wide tracemalloc snapshot, the slowest part of the report.
+    """
+    if not admin_authorized():
+        return not_found(None)
+    return jsonify(memory_reporter.report(include_sites=request.args.get('sites') != '0'))
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    """Stored request profiles, newest first"""
+    if not admin_authorized() or request_profiler is None:
+        return not_found(None)
+    return jsonify({'profiles': request_profiler.recent(), 'profiler': request_profiler.stats()})
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """A stored profile as collapsed stacks (flamegraph.pl, speedscope)"""
+    if not admin_authorized() or request_profiler is None:
+        return not_found(None)
+    try:
+        body = request_profiler.load(profile_id)
+    except KeyError:
+        return jsonify({'error': 'Profile not found'}), 404
+    response = app.response_class(body, mimetype='text/plain')
+    response.headers['Content-Disposition'] = f'attachment; filename={profile_id}.collapsed'
+    return response
+
 @app.route('/api/questions/start', methods=['POST'])
 def start_question_flow():
     """Start a new question flow session"""
@@ -216,6 +612,7 @@ def start_question_flow():
         session_id = str(int(time.time() * 1000))  # Unique session ID
         
         if QUESTIONER_AVAILABLE:
+            from product_questions import ProductQuestioner
             questioner = ProductQuestioner()
             first_question = questioner.start_question_flow(product_type)
             
@@ -318,11 +715,25 @@ def persona_debate_endpoint():
         
         products = data['products']
         preference = data.get('preference', 'neutral')
+        try:
+            price_range = parse_price_range(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if price_range is not None:
+            products = PriceIndex(products).within(*price_range)
+            if not products:
+                return jsonify({
+                    'success': True,
+                    'final_choice': None,
+                    'preference': preference,
+                    'message': 'No products in the requested price range',
+                    'timestamp': datetime.now().isoformat()
+                })
         
         if WEBSCRAPER_AVAILABLE:
             try:
                 # Use the actual persona debate function
-                final_choice = persona_debate(products, preference)
+                final_choice = scraper().persona_debate(products, preference)
                 
                 return jsonify({
                     'success': True,
@@ -382,9 +793,15 @@ if __name__ == '__main__':
     print("🔍 API endpoints:")
     print("   - GET  /api/health")
     print("   - POST /api/scrape")
+    print("   - GET  /api/scrape?search_query=...  (cacheable, ETag/304)")
+    print("   - GET  /api/scrape/stream?search_query=...  (NDJSON, per-platform progress)")
     print("   - GET  /api/platforms")
     print("   - POST /api/clear-cache")
     print("   - POST /api/persona-debate")
+    print("   - GET  /api/price-history?url=...")
+    print("   - POST /api/jobs  (bulk searches, GET /api/jobs/<id>/results streams NDJSON)")
+    print("   - GET  /api/admin/memory  (X-Admin-Token)")
+    print("   - GET  /api/admin/profiles  (X-Admin-Token; /api/admin/profiles/<id> downloads one)")
     app.run(debug=True, host='0.0.0.0', port=5000)
 
 
@@ -0,0 +1,276 @@
+import os
+import time
+import signal
+import sqlite3
+import threading
+
+# Bounds for the number of retailer fetches a worker runs at once
+MIN_CONCURRENCY = 2
+MAX_CONCURRENCY = 16
+# Requests waiting for a fetch slot before new searches are shed
+MAX_QUEUE = 8
+
+# Per-platform fetch timeout bounds (seconds); the live value tracks observed latency
+MIN_TIMEOUT = 3.0
+MAX_TIMEOUT = 15.0
+DEFAULT_TIMEOUT = 10.0
+
+# Completions between concurrency adjustments
+ADJUST_WINDOW = 10
+# Short-term latency this many times the long-term baseline counts as congestion
+LATENCY_TOLERANCE = 1.5
+
+
+class Overloaded(Exception):
+    """Raised when a worker is too busy to start another scrape"""
+
+
+class PlatformLatency:
+    """Short and long-term exponentially weighted latency of one platform"""
+
+    def __init__(self):
+        self.samples = 0
+        self.short = 0.0      # reacts within a few requests
+        self.baseline = 0.0   # what "normal" looks like for this platform
+        self.deviation = 0.0
+        self.failures = 0  # timeouts and connection errors
+
+    def record(self, latency):
+        if self.samples == 0:
+            self.short = self.baseline = latency
+        else:
+            self.deviation += 0.2 * (abs(latency - self.short) - self.deviation)
+            self.short += 0.2 * (latency - self.short)
+            self.baseline += 0.02 * (latency - self.baseline)
+        self.samples += 1
+
+    def timeout(self, minimum, maximum, default):
+        """Generous multiple of typical latency, so stragglers are cut without failing normal pages"""
+        if self.samples < 5:
+            return default
+        return min(max(self.short + 4 * self.deviation, 2 * self.baseline, minimum), maximum)
+
+    def congestion(self):
+        return self.short / self.baseline if self.baseline > 0 else 1.0
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on concurrent retailer fetches, driven by upstream latency and timeouts"""
+
+    def __init__(self, min_limit=MIN_CONCURRENCY, max_limit=MAX_CONCURRENCY, max_queue=MAX_QUEUE,
+                 min_timeout=MIN_TIMEOUT, max_timeout=MAX_TIMEOUT, default_timeout=DEFAULT_TIMEOUT,
+                 load_board=None):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.default_timeout = default_timeout
+        self.limit = max(min_limit, min(max_limit, (min_limit + max_limit) // 2))
+        self.in_flight = 0
+        self.waiting = 0
+        self.platforms = {}  # platform -> PlatformLatency
+        self.condition = threading.Condition()
+        self.load_board = load_board
+        self.reported_at = 0.0
+        self._reset_window()
+        self.adjustments = {'increase': 0, 'decrease': 0}
+        self.shed = 0
+
+    def _reset_window(self):
+        self.window_completions = 0
+        self.window_failures = 0
+        self.window_congestion = 0.0
+        self.window_peak = 0
+
+    def _latency(self, platform):
+        stats = self.platforms.get(platform)
+        if stats is None:
+            stats = self.platforms[platform] = PlatformLatency()
+        return stats
+
+    def timeout_for(self, platform):
+        """Current fetch timeout for a platform"""
+        with self.condition:
+            return self._latency(platform).timeout(self.min_timeout, self.max_timeout, self.default_timeout)
+
+    def saturated(self):
+        """True when the queue for fetch slots is already full"""
+        return self.waiting >= self.max_queue
+
+    def admit(self):
+        """Raise Overloaded instead of queueing another search behind a full queue"""
+        if self.saturated():
+            self.shed += 1
+            raise Overloaded(f"{self.in_flight} fetches in flight, {self.waiting} queued")
+
+    def acquire(self, timeout=None):
+        """Wait for a fetch slot; raises Overloaded if none frees up within `timeout` seconds"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            self.waiting += 1
+            try:
+                while self.in_flight >= self.limit:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.shed += 1
+                        raise Overloaded(f"No fetch slot within {timeout}s")
+                    self.condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.window_peak = max(self.window_peak, self.in_flight)
+        self._report()
+
+    def release(self, platform, latency, ok=True, cancelled=False):
+        """Return a slot and feed the fetch outcome into the controller
+
+        Fetches cut short by the caller (cancelled) say nothing about the upstream and are not counted.
+        """
+        with self.condition:
+            self.in_flight -= 1
+            if cancelled:
+                self.condition.notify_all()
+                return
+            stats = self._latency(platform)
+            if ok:
+                stats.record(latency)
+            else:
+                stats.failures += 1
+                self.window_failures += 1
+            self.window_completions += 1
+            self.window_congestion += stats.congestion()
+            if self.window_completions >= ADJUST_WINDOW:
+                self._adjust()
+            self.condition.notify_all()
+        self._report()
+
+    def _adjust(self):
+        congestion = self.window_congestion / self.window_completions
+        if self.window_failures or congestion > LATENCY_TOLERANCE:
+            # Upstream is struggling: back off multiplicatively
+            new_limit = max(self.min_limit, int(self.limit * 0.75))
+            if new_limit < self.limit:
+                self.adjustments['decrease'] += 1
+            self.limit = new_limit
+        elif self.window_peak >= self.limit and self.limit < self.max_limit:
+            # Demand hit the limit while latency stayed normal: probe one more slot
+            self.limit += 1
+            self.adjustments['increase'] += 1
+        self._reset_window()
+
+    def utilization(self):
+        """Fraction of capacity in use, above 1 when searches are queueing"""
+        return (self.in_flight + self.waiting) / self.limit
+
+    def _report(self):
+        if self.load_board is None or time.time() - self.reported_at < LoadBoard.REPORT_INTERVAL:
+            return
+        self.reported_at = time.time()
+        try:
+            self.load_board.report(self.utilization())
+        except Exception as e:
+            print(f"⚠️ Could not report worker load: {e}")
+
+    def stats(self):
+        with self.condition:
+            return {
+                'limit': self.limit,
+                'in_flight': self.in_flight,
+                'queued': self.waiting,
+                'shed': self.shed,
+                'adjustments': dict(self.adjustments),
+                'platforms': {
+                    platform: {
+                        'latency': round(s.short, 3),
+                        'baseline': round(s.baseline, 3),
+                        'timeout': round(s.timeout(self.min_timeout, self.max_timeout, self.default_timeout), 2),
+                        'failures': s.failures
+                    } for platform, s in self.platforms.items()
+                }
+            }
+
+
+class LoadBoard:
+    """Per-worker utilization published through SQLite so the gunicorn master can scale workers"""
+
+    REPORT_INTERVAL = 5  # seconds between reports from one worker
+    MAX_AGE = 30         # reports older than this are ignored
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS worker_load (pid INTEGER PRIMARY KEY, utilization REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or getattr(self.local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def report(self, utilization):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO worker_load (pid, utilization, updated_at) VALUES (?, ?, ?)',
+            (os.getpid(), utilization, time.time())
+        )
+
+    def current(self, pids):
+        """Latest utilization of each live worker pid (0 when it has not reported recently)"""
+        conn = self._connection()
+        conn.execute('DELETE FROM worker_load WHERE updated_at < ?', (time.time() - self.MAX_AGE,))
+        rows = dict(conn.execute('SELECT pid, utilization FROM worker_load').fetchall())
+        return [rows.get(pid, 0.0) for pid in pids]
+
+
+class WorkerScaler:
+    """Runs in the gunicorn master: adds workers under sustained load and removes idle ones
+
+    Uses gunicorn's own TTIN/TTOU signals, so the arbiter stays in charge of forking.
+    """
+
+    def __init__(self, server, board, min_workers, max_workers, interval=10, high=0.8, low=0.2, cooldown=60):
+        self.server = server
+        self.board = board
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.interval = interval
+        self.high = high
+        self.low = low
+        self.cooldown = cooldown
+        self.changed_at = 0.0
+        self.stop_event = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name='worker-scaler', daemon=True).start()
+        print(f"📈 Worker autoscaling between {self.min_workers} and {self.max_workers} workers")
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"⚠️ Worker scaler error: {e}")
+
+    def tick(self):
+        if time.time() - self.changed_at < self.cooldown:
+            return
+        loads = self.board.current(list(self.server.WORKERS))
+        if not loads:
+            return
+        average = sum(loads) / len(loads)
+        workers = self.server.num_workers
+        if average > self.high and workers < self.max_workers:
+            os.kill(self.server.pid, signal.SIGTTIN)
+        elif average < self.low and workers > self.min_workers:
+            os.kill(self.server.pid, signal.SIGTTOU)
+        else:
+            return
+        self.changed_at = time.time()
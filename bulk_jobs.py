@@ -0,0 +1,269 @@
+import os
+import re
+import time
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from json_provider import encode_json, decode_json
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows - a job is only ever run by the worker that accepted it
+    FCNTL_AVAILABLE = False
+
+# Job layout on disk (one directory per job, readable by every gunicorn worker):
+#   job.json       : queries, search parameters and status
+#   results.ndjson : one line per finished query - doubles as the checkpoint
+#   lock           : flock held by the worker currently running the job
+#   cancelled      : empty marker, so running workers notice a cancel with one stat per query
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{16}$')
+MAX_QUERIES_PER_JOB = 5000
+FINAL_STATUSES = ('completed', 'cancelled')
+
+
+def _truncate_torn_line(f, chunk_size=4096):
+    """Cut a partial last line (left by a worker that died mid-write) back to the last newline"""
+    end = f.seek(0, os.SEEK_END)
+    position = end
+    while position > 0:
+        start = max(position - chunk_size, 0)
+        f.seek(start)
+        chunk = f.read(position - start)
+        newline = chunk.rfind(b'\n')
+        if newline >= 0:
+            position = start + newline + 1
+            break
+        position = start
+    if position < end:
+        f.truncate(position)
+
+
+class JobNotFound(Exception):
+    """Raised for unknown or malformed job ids"""
+
+
+class BulkJobStore:
+    """Batch search jobs persisted as a job file plus an append-only NDJSON result log"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+
+    def _path(self, job_id, name):
+        if not JOB_ID_PATTERN.match(job_id or ''):
+            raise JobNotFound(job_id)
+        return os.path.join(self.directory, job_id, name)
+
+    def create(self, queries, params):
+        """Persist a new job and return its id"""
+        job_id = secrets.token_hex(8)
+        os.makedirs(os.path.join(self.directory, job_id))
+        now = time.time()
+        self._write_job(job_id, {
+            'id': job_id,
+            'status': 'queued',
+            'queries': queries,
+            'params': params,
+            'created_at': now,
+            'updated_at': now
+        })
+        open(self._path(job_id, 'results.ndjson'), 'ab').close()
+        return job_id
+
+    def _write_job(self, job_id, job):
+        path = self._path(job_id, 'job.json')
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(encode_json(job))
+        os.replace(tmp_path, path)
+
+    def load(self, job_id):
+        try:
+            with open(self._path(job_id, 'job.json'), 'rb') as f:
+                return decode_json(f.read())
+        except FileNotFoundError:
+            raise JobNotFound(job_id)
+
+    def set_status(self, job_id, status):
+        with self.lock:
+            job = self.load(job_id)
+            if job['status'] in FINAL_STATUSES:
+                return job
+            if status == 'cancelled':
+                open(self._path(job_id, 'cancelled'), 'ab').close()
+            job['status'] = status
+            job['updated_at'] = time.time()
+            self._write_job(job_id, job)
+            return job
+
+    def is_cancelled(self, job_id):
+        return os.path.exists(self._path(job_id, 'cancelled'))
+
+    def append_result(self, job_id, record):
+        """Checkpoint one finished query"""
+        line = encode_json(record) + b'\n'
+        with self.lock:
+            with open(self._path(job_id, 'results.ndjson'), 'r+b') as f:
+                _truncate_torn_line(f)
+                f.seek(0, os.SEEK_END)
+                f.write(line)
+
+    def finished_indices(self, job_id):
+        """Indices of queries that already have a result line"""
+        done = set()
+        for record in self.results(job_id):
+            done.add(record['index'])
+        return done
+
+    def results(self, job_id, start=0):
+        """Decoded result records from line `start` on (torn or corrupt lines are skipped)"""
+        for line in self.result_lines(job_id, start):
+            try:
+                yield decode_json(line)
+            except ValueError:
+                continue
+
+    def result_lines(self, job_id, start=0):
+        try:
+            with open(self._path(job_id, 'results.ndjson'), 'rb') as f:
+                for i, line in enumerate(f):
+                    if i >= start and line.endswith(b'\n'):
+                        yield line
+        except FileNotFoundError:
+            raise JobNotFound(job_id)
+
+    def progress(self, job_id):
+        job = self.load(job_id)
+        completed = failed = 0
+        for record in self.results(job_id):
+            if 'error' in record:
+                failed += 1
+            else:
+                completed += 1
+        total = len(job['queries'])
+        return {
+            'id': job_id,
+            'status': job['status'],
+            'total': total,
+            'completed': completed,
+            'failed': failed,
+            'remaining': total - completed - failed,
+            'params': job['params'],
+            'created_at': job['created_at'],
+            'updated_at': job['updated_at']
+        }
+
+    def pending_jobs(self):
+        """Ids of jobs that still have work, oldest first"""
+        jobs = []
+        for job_id in os.listdir(self.directory):
+            try:
+                job = self.load(job_id)
+            except (JobNotFound, ValueError, OSError):
+                continue
+            if job['status'] not in FINAL_STATUSES:
+                jobs.append((job['created_at'], job_id))
+        return [job_id for _, job_id in sorted(jobs)]
+
+
+class BulkJobRunner:
+    """Background thread that works through pending jobs with a bounded pool per worker
+
+    A job is run by whichever worker holds its flock; if that worker dies another one resumes it
+    from the NDJSON checkpoint.
+    """
+
+    def __init__(self, store, process_fn, concurrency=2, poll_interval=5):
+        self.store = store
+        self.process_fn = process_fn  # (query, params) -> result dict
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.active_job = None
+        self.processed = 0
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='bulk-jobs', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+
+    def notify(self):
+        """Check for new jobs now instead of at the next poll"""
+        self.wake.set()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                for job_id in self.store.pending_jobs():
+                    if self.stop_event.is_set():
+                        break
+                    self._run_locked(job_id)
+            except Exception as e:
+                print(f"⚠️ Bulk job runner error: {e}")
+            self.wake.wait(self.poll_interval)
+            self.wake.clear()
+
+    def _run_locked(self, job_id):
+        if not FCNTL_AVAILABLE:
+            return self.run_job(job_id)
+        with open(self.store._path(job_id, 'lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return  # another worker is running it
+            self.run_job(job_id)
+
+    def run_job(self, job_id):
+        """Process every query of a job that has no checkpointed result yet"""
+        job = self.store.load(job_id)
+        if job['status'] in FINAL_STATUSES:
+            return
+        done = self.store.finished_indices(job_id)
+        pending = [(i, q) for i, q in enumerate(job['queries']) if i not in done]
+        self.store.set_status(job_id, 'running')
+        self.active_job = job_id
+        print(f"📋 Bulk job {job_id}: {len(pending)} of {len(job['queries'])} queries to run")
+        cancelled = threading.Event()
+
+        def process(item):
+            index, query = item
+            if cancelled.is_set() or self.stop_event.is_set():
+                return
+            if self.store.is_cancelled(job_id):
+                cancelled.set()
+                return
+            record = {'index': index, 'query': query}
+            try:
+                record.update(self.process_fn(query, job['params']))
+            except Exception as e:
+                record['error'] = str(e)
+            self.store.append_result(job_id, record)
+            self.processed += 1
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='bulk') as pool:
+                list(pool.map(process, pending))
+        finally:
+            self.active_job = None
+        if not cancelled.is_set() and not self.stop_event.is_set():
+            self.store.set_status(job_id, 'completed')
+            print(f"✅ Bulk job {job_id} completed")
+
+    def stats(self):
+        return {
+            'running': self.thread is not None and self.thread.is_alive(),
+            'active_job': self.active_job,
+            'concurrency': self.concurrency,
+            'processed': self.processed
+        }
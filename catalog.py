@@ -0,0 +1,170 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+
+from query_normalizer import query_tokens
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    url TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    price REAL NOT NULL DEFAULT 0,
+    rating REAL NOT NULL DEFAULT 0,
+    image TEXT,
+    platform TEXT,
+    platform_icon TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS product_history (
+    url TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    price REAL NOT NULL,
+    rating REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_product_history_url ON product_history (url, seen_at);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5 (
+    title, platform, url UNINDEXED, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+PRODUCT_FIELDS = ('title', 'price', 'rating', 'url', 'image', 'platform', 'platform_icon')
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def stem_prefix(token):
+    """Prefix shared by a singular and its plural ("battery"/"batteries" -> "batter")"""
+    return token[:-1] if token.endswith('y') and len(token) > 3 else token
+
+
+class ProductCatalog:
+    """Persistent SQLite catalog of every scraped product with a full-text title index"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.write_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        try:
+            conn.executescript(FTS_SCHEMA)
+            self.fts_available = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 - fall back to LIKE matching
+            self.fts_available = False
+        conn.commit()
+
+    def _connection(self):
+        """One connection per thread; WAL lets gunicorn workers read while another writes"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or getattr(self.local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def upsert_products(self, products):
+        """Insert or refresh products keyed by URL, recording price/rating changes"""
+        now = time.time()
+        rows = [p for p in products if p.get('url') and p['url'] != 'N/A']
+        if not rows:
+            return 0
+
+        conn = self._connection()
+        with self.write_lock, conn:
+            for p in rows:
+                title = p.get('title') or 'N/A'
+                price = float(p.get('price') or 0)
+                rating = float(p.get('rating') or 0)
+                existing = conn.execute(
+                    'SELECT rowid, title, price, rating FROM products WHERE url = ?', (p['url'],)
+                ).fetchone()
+
+                if existing is None:
+                    cur = conn.execute(
+                        'INSERT INTO products (url, title, price, rating, image, platform, platform_icon, '
+                        'first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (p['url'], title, price, rating, p.get('image', ''), p.get('platform', ''),
+                         p.get('platform_icon', ''), now, now)
+                    )
+                    if self.fts_available:
+                        conn.execute('INSERT INTO products_fts (rowid, title, platform, url) VALUES (?, ?, ?, ?)',
+                                     (cur.lastrowid, title, p.get('platform', ''), p['url']))
+                    changed = True
+                else:
+                    # Missing optional fields keep their stored values
+                    conn.execute(
+                        'UPDATE products SET title = ?, price = ?, rating = ?, image = COALESCE(?, image), '
+                        'platform = COALESCE(?, platform), platform_icon = COALESCE(?, platform_icon), '
+                        'last_seen = ? WHERE url = ?',
+                        (title, price, rating, p.get('image') or None, p.get('platform') or None,
+                         p.get('platform_icon') or None, now, p['url'])
+                    )
+                    if self.fts_available and existing['title'] != title:
+                        conn.execute('UPDATE products_fts SET title = ? WHERE rowid = ?', (title, existing['rowid']))
+                    changed = existing['price'] != price or existing['rating'] != rating
+
+                # History only grows when something actually moved
+                if changed:
+                    conn.execute('INSERT INTO product_history (url, seen_at, price, rating) VALUES (?, ?, ?, ?)',
+                                 (p['url'], now, price, rating))
+        return len(rows)
+
+    def search(self, search_query, limit=12):
+        """Return catalog products matching all query tokens, best matches first"""
+        # Same folding and plural stemming as the cache keys, so "Laptops" finds "laptop"
+        tokens = [stem_prefix(part) for token in query_tokens(search_query) for part in TOKEN_PATTERN.findall(token)]
+        if not tokens:
+            return []
+
+        conn = self._connection()
+        if self.fts_available:
+            # Prefix match each token so "laptop" also finds "laptops"
+            match = ' '.join('"{}"*'.format(t.replace('"', '')) for t in tokens)
+            rows = conn.execute(
+                'SELECT p.* FROM products_fts f JOIN products p ON p.rowid = f.rowid '
+                'WHERE products_fts MATCH ? ORDER BY bm25(products_fts) LIMIT ?',
+                (match, limit)
+            ).fetchall()
+        else:
+            clauses = ' AND '.join('lower(title) LIKE ?' for _ in tokens)
+            rows = conn.execute(
+                f'SELECT * FROM products WHERE {clauses} ORDER BY last_seen DESC LIMIT ?',
+                [f'%{t}%' for t in tokens] + [limit]
+            ).fetchall()
+        return [self._row_to_product(row) for row in rows]
+
+    def history(self, url):
+        """Price/rating history for a product URL, oldest first"""
+        rows = self._connection().execute(
+            'SELECT seen_at, price, rating FROM product_history WHERE url = ? ORDER BY seen_at', (url,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        """Row counts for the health endpoint"""
+        conn = self._connection()
+        return {
+            'products': conn.execute('SELECT COUNT(*) FROM products').fetchone()[0],
+            'history_points': conn.execute('SELECT COUNT(*) FROM product_history').fetchone()[0],
+            'full_text_search': self.fts_available
+        }
+
+    @staticmethod
+    def _row_to_product(row):
+        product = {field: row[field] for field in PRODUCT_FIELDS}
+        product['last_seen'] = row['last_seen']
+        return product
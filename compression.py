@@ -0,0 +1,161 @@
+import os
+import gzip
+import mimetypes
+import threading
+from collections import OrderedDict
+
+from http_cache import compute_etag
+
+# Brotli is optional - gzip is always available
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Responses smaller than this are not worth compressing
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'application/x-ndjson',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+}
+
+# Static files worth precompressing at startup
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.html')
+
+SUPPORTED_ENCODINGS = ['br', 'gzip'] if BROTLI_AVAILABLE else ['gzip']
+
+# Fast settings for per-request compression, maximum settings for static assets
+DYNAMIC_LEVELS = {'gzip': 6, 'br': 5}
+STATIC_LEVELS = {'gzip': 9, 'br': 11}
+
+# Compressed bodies of cached API responses, keyed by (etag, encoding)
+MAX_COMPRESSED_ENTRIES = 256
+_compressed_cache = OrderedDict()
+_compressed_lock = threading.Lock()
+
+
+def negotiate_encoding(request):
+    """Pick the best content encoding the client accepts, or None for identity"""
+    return request.accept_encodings.best_match(SUPPORTED_ENCODINGS)
+
+
+def compress(body, encoding, levels=DYNAMIC_LEVELS):
+    """Compress bytes with the given content encoding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=levels['br'])
+    return gzip.compress(body, compresslevel=levels['gzip'], mtime=0)
+
+
+def compress_response(response, request):
+    """after_request hook: compress JSON/text responses above the size threshold"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request)
+    if encoding is None:
+        return response
+
+    etag, weak = response.get_etag()
+    if etag:
+        # Cached API bodies carry an ETag, so each encoding is compressed once
+        key = (etag, encoding)
+        with _compressed_lock:
+            compressed = _compressed_cache.get(key)
+            if compressed is not None:
+                _compressed_cache.move_to_end(key)
+        if compressed is None:
+            compressed = compress(body, encoding)
+            with _compressed_lock:
+                _compressed_cache[key] = compressed
+                if len(_compressed_cache) > MAX_COMPRESSED_ENTRIES:
+                    _compressed_cache.popitem(last=False)
+        # The compressed representation is no longer byte-identical
+        if not weak:
+            response.set_etag(etag, weak=True)
+    else:
+        compressed = compress(body, encoding)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class StaticAssetStore:
+    """Static files held in memory together with their precompressed variants"""
+
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Read and precompress every static asset in the root directory"""
+        for name in sorted(os.listdir(self.root)):
+            if name.endswith(PRECOMPRESS_EXTENSIONS):
+                self._load_asset(name)
+        print(f"🗜️ Precompressed {len(self.assets)} static assets ({', '.join(SUPPORTED_ENCODINGS)})")
+
+    def _load_asset(self, path):
+        full_path = os.path.join(self.root, path)
+        stat = os.stat(full_path)
+        with open(full_path, 'rb') as f:
+            body = f.read()
+
+        variants = {None: body}
+        for encoding in SUPPORTED_ENCODINGS:
+            compressed = compress(body, encoding, STATIC_LEVELS)
+            if len(compressed) < len(body):
+                variants[encoding] = compressed
+
+        asset = {
+            'mtime': stat.st_mtime,
+            'mimetype': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            'etag': compute_etag(body),
+            'variants': variants
+        }
+        with self.lock:
+            self.assets[path] = asset
+        return asset
+
+    def get(self, path):
+        """Return the in-memory asset for a path, reloading it if the file changed"""
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+        try:
+            if os.stat(os.path.join(self.root, path)).st_mtime != asset['mtime']:
+                asset = self._load_asset(path)
+        except OSError:
+            return None
+        return asset
+
+    def response(self, asset, request, response_class):
+        """Build a conditional response for an asset using the negotiated encoding"""
+        encoding = negotiate_encoding(request)
+        if encoding not in asset['variants']:
+            encoding = None
+
+        response = response_class(asset['variants'][encoding], mimetype=asset['mimetype'])
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+            response.set_etag(f"{asset['etag']}-{encoding}")
+        else:
+            response.set_etag(asset['etag'])
+        response.last_modified = asset['mtime']
+        return response.make_conditional(request)
@@ -0,0 +1,65 @@
+import math
+import time
+import contextvars
+from contextlib import contextmanager
+
+# Absolute time.monotonic() by which the current request must be answered (None = no deadline)
+current_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work is started or continued after the request deadline"""
+
+
+@contextmanager
+def request_deadline(seconds):
+    """Run the block with a deadline `seconds` from now (an enclosing, earlier deadline wins)"""
+    deadline = None if seconds is None else time.monotonic() + seconds
+    outer = current_deadline.get()
+    if outer is not None and (deadline is None or outer < deadline):
+        deadline = outer
+    token = current_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+
+def time_remaining():
+    """Seconds left before the deadline, or None when there is none"""
+    deadline = current_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired():
+    remaining = time_remaining()
+    return remaining is not None and remaining <= 0
+
+
+def check_deadline(step=''):
+    """Raise DeadlineExceeded if the deadline has passed"""
+    if expired():
+        raise DeadlineExceeded(f"Request deadline passed{' before ' + step if step else ''}")
+
+
+def clamp_timeout(timeout):
+    """The smaller of `timeout` and the time remaining (None means unbounded)"""
+    remaining = time_remaining()
+    if remaining is None:
+        return timeout
+    remaining = max(remaining, 0)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def parse_timeout(value, default, maximum, minimum=0.5):
+    """Read a client supplied timeout in seconds ("8", "8.5", "800ms"); falls back to `default`"""
+    if value in (None, ''):
+        return default
+    try:
+        text = str(value).strip().lower()
+        seconds = float(text[:-2]) / 1000 if text.endswith('ms') else float(text.rstrip('s'))
+    except ValueError:
+        return default
+    if not math.isfinite(seconds):
+        return default  # "nan" would slip through min/max and expire every wait at once
+    return min(max(seconds, minimum), maximum)
@@ -0,0 +1,36 @@
+import os
+
+# Gunicorn settings for production (used by start.sh)
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Threaded workers: requests waiting on retailers do not block the whole worker
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 120
+# Searches answer with partial results before gunicorn would kill the worker
+os.environ.setdefault('MAX_REQUEST_TIMEOUT', str(timeout - 10))
+
+# Import the app and warm shared state (compiled selectors, scraper modules, question
+# templates) once in the master; forked workers inherit it copy-on-write. PRELOAD_APP=0 disables.
+preload_app = os.environ.get('PRELOAD_APP', '1') != '0'
+if preload_app:
+    os.environ['GUNICORN_PRELOAD'] = '1'
+
+# Grow up to MAX_WORKERS while workers report sustained fetch-queue pressure (0 disables)
+max_workers = int(os.environ.get('MAX_WORKERS', 0))
+if max_workers > workers:
+    os.environ.setdefault('AUTOTUNE_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                      'instance', 'autotune.db'))
+
+
+def when_ready(server):
+    """Start the worker autoscaler in the master"""
+    if max_workers > workers:
+        from autotune import LoadBoard, WorkerScaler
+        WorkerScaler(server, LoadBoard(os.environ['AUTOTUNE_DB']), workers, max_workers).start()
+
+
+def post_fork(server, worker):
+    """Start per-worker background threads, which do not survive the fork"""
+    if preload_app:
+        import app
+        app.start_worker_services()
@@ -0,0 +1,82 @@
+import os
+import re
+import hashlib
+import threading
+
+from werkzeug.security import safe_join
+
+# Fingerprinted static assets never change under the same URL
+STATIC_MAX_AGE = 31536000  # 1 year
+
+# Local .css/.js references in HTML, e.g. href="modern-styles.css" or src="script.js"
+ASSET_REF_PATTERN = re.compile(r'\b(href|src)="([^"?#:]+\.(?:css|js))"')
+
+_fingerprint_lock = threading.Lock()
+_fingerprints = {}  # absolute path -> (mtime, size, digest)
+_html_cache = {}  # absolute path -> (mtime, fingerprints, html)
+
+
+def compute_etag(body):
+    """Strong ETag for an encoded response body"""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def file_fingerprint(root, path):
+    """Content hash of a file under root, recomputed only when the file changes"""
+    full_path = safe_join(root, path)
+    if full_path is None or not os.path.isfile(full_path):
+        return None
+
+    stat = os.stat(full_path)
+    cached = _fingerprints.get(full_path)
+    if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        return cached[2]
+
+    with open(full_path, 'rb') as f:
+        digest = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+    with _fingerprint_lock:
+        _fingerprints[full_path] = (stat.st_mtime, stat.st_size, digest)
+    return digest
+
+
+def versioned_html(root, path):
+    """Read an HTML page with its local CSS/JS references rewritten to fingerprinted URLs"""
+    full_path = safe_join(root, path)
+    mtime = os.stat(full_path).st_mtime
+
+    # Reuse the rewritten page while neither it nor any referenced asset changed
+    cached = _html_cache.get(full_path)
+    if cached and cached[0] == mtime:
+        refs = cached[1]
+        if tuple(file_fingerprint(root, ref) for ref in refs) == cached[2]:
+            return cached[3]
+
+    with open(full_path, 'r', encoding='utf-8') as f:
+        html = f.read()
+    refs = tuple(sorted(set(m.group(2) for m in ASSET_REF_PATTERN.finditer(html))))
+    fingerprints = tuple(file_fingerprint(root, ref) for ref in refs)
+    versions = dict(zip(refs, fingerprints))
+
+    def add_version(match):
+        attr, ref = match.group(1), match.group(2)
+        version = versions.get(ref)
+        return f'{attr}="{ref}?v={version}"' if version else match.group(0)
+
+    html = ASSET_REF_PATTERN.sub(add_version, html)
+    with _fingerprint_lock:
+        _html_cache[full_path] = (mtime, refs, fingerprints, html)
+    return html
+
+
+def apply_static_caching(response, root, path, version):
+    """Long-lived caching for fingerprinted URLs, revalidation for everything else"""
+    if version and version == file_fingerprint(root, path):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,186 @@
+import os
+import io
+import hashlib
+import threading
+from urllib.parse import urlsplit, urljoin
+
+# Pillow is optional - without it images are proxied and cached at their original size
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Thumbnails are only produced at these widths so the cache stays small
+THUMBNAIL_WIDTHS = (120, 240, 480)
+DEFAULT_WIDTH = 240
+JPEG_QUALITY = 80
+
+# Only retailer/demo image CDNs may be proxied (suffix match on the host name)
+ALLOWED_IMAGE_HOSTS = (
+    'media-amazon.com',
+    'ssl-images-amazon.com',
+    'flixcart.com',
+    'myntassets.com',
+    'picsum.photos',
+)
+
+MAX_SOURCE_BYTES = 5 * 1024 * 1024
+FETCH_TIMEOUT = 10
+# Redirects are followed by hand so every hop goes through the host allowlist
+MAX_REDIRECTS = 3
+
+
+class ImageProxyError(Exception):
+    """Raised for URLs the proxy refuses or cannot fetch"""
+
+
+def fetch_remote_image(url, check_url=None):
+    """Download source image bytes from a retailer CDN
+
+    check_url(url) is applied to every redirect target (raising ImageProxyError to refuse it).
+    """
+    import requests  # only image proxy requests pay for this import
+
+    for _ in range(MAX_REDIRECTS + 1):
+        r = requests.get(url, timeout=FETCH_TIMEOUT, stream=True, allow_redirects=False,
+                         headers={'User-Agent': 'Mozilla/5.0'})
+        if not r.is_redirect:
+            break
+        location = r.headers.get('Location')
+        r.close()
+        if not location:
+            raise ImageProxyError('Redirect without a location')
+        url = urljoin(url, location)
+        if check_url is not None:
+            check_url(url)
+    else:
+        raise ImageProxyError('Too many redirects')
+    r.raise_for_status()
+    data = r.raw.read(MAX_SOURCE_BYTES + 1, decode_content=True)
+    if len(data) > MAX_SOURCE_BYTES:
+        raise ImageProxyError('Source image too large')
+    return data
+
+
+def make_thumbnail(data, width):
+    """Resize image bytes to `width` pixels wide; returns (bytes, mimetype)"""
+    if not PIL_AVAILABLE:
+        return data, None
+    with Image.open(io.BytesIO(data)) as img:
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.LANCZOS)
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        out = io.BytesIO()
+        img.save(out, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return out.getvalue(), 'image/jpeg'
+
+
+def sniff_mimetype(data):
+    """Best-effort image type from magic bytes"""
+    if data.startswith(b'\xff\xd8'):
+        return 'image/jpeg'
+    if data.startswith(b'\x89PNG'):
+        return 'image/png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    return 'application/octet-stream'
+
+
+class ThumbnailCache:
+    """Bounded on-disk LRU of resized product images keyed by source URL and width"""
+
+    def __init__(self, directory, max_bytes, fetcher=fetch_remote_image, allowed_hosts=ALLOWED_IMAGE_HOSTS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fetcher = fetcher
+        self.allowed_hosts = tuple(allowed_hosts)
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(size for _, _, size in self._files())
+        self.hits = 0
+        self.misses = 0
+
+    def _files(self):
+        """(path, last_used, size) for every cached thumbnail"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def check_url(self, url):
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        if parts.scheme not in ('http', 'https') or not any(
+                host == allowed or host.endswith('.' + allowed) for allowed in self.allowed_hosts):
+            raise ImageProxyError('Image host not allowed')
+
+    def get(self, url, width=DEFAULT_WIDTH):
+        """Return (bytes, mimetype, etag) for a thumbnail, fetching and resizing on a miss"""
+        if width not in THUMBNAIL_WIDTHS:
+            raise ImageProxyError(f"Width must be one of {THUMBNAIL_WIDTHS}")
+        self.check_url(url)
+
+        key = hashlib.blake2b(f"{width}:{url}".encode('utf-8'), digest_size=16).hexdigest()
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used for LRU eviction
+            self.hits += 1
+        except FileNotFoundError:
+            self.misses += 1
+            source = self.fetcher(url, check_url=self.check_url)
+            try:
+                data, _ = make_thumbnail(source, width)
+            except Exception:
+                data = source  # not decodable by Pillow - pass the original through
+            self._store(path, data)
+
+        etag = hashlib.blake2b(data, digest_size=16).hexdigest()
+        return data, sniff_mimetype(data), etag
+
+    def _store(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.total_bytes += len(data)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used thumbnails until the cache is 90% of its budget"""
+        files = sorted(self._files(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in files)
+        target = self.max_bytes * 0.9
+        for path, _, size in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self.total_bytes = total
+
+    def stats(self):
+        return {
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'resizing': PIL_AVAILABLE
+        }
@@ -0,0 +1,63 @@
+import os
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+# orjson is optional - fall back to the standard library when it is missing
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Set JSON_PROVIDER=stdlib to force the standard library encoder
+USE_ORJSON = ORJSON_AVAILABLE and os.environ.get('JSON_PROVIDER', 'orjson').lower() != 'stdlib'
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if ORJSON_AVAILABLE else 0
+
+
+def encode_json(obj):
+    """Encode an object to JSON bytes using the fastest available encoder"""
+    if USE_ORJSON:
+        try:
+            return orjson.dumps(obj, default=DefaultJSONProvider.default, option=ORJSON_OPTIONS)
+        except (TypeError, orjson.JSONEncodeError):
+            pass  # e.g. integers wider than 64 bits - let the stdlib handle it
+    return json.dumps(obj, default=DefaultJSONProvider.default, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def decode_json(data):
+    """Decode JSON from bytes or str"""
+    if USE_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson with a stdlib fallback"""
+
+    def dumps(self, obj, **kwargs):
+        # Callers asking for stdlib-specific options (indent, sort_keys...) get the stdlib path
+        if kwargs or not USE_ORJSON:
+            return super().dumps(obj, **kwargs)
+        return encode_json(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs or not USE_ORJSON:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(obj)
+        return json_bytes_response(encode_json(obj), response_class=self._app.response_class)
+
+
+def json_bytes_response(body, status=200, response_class=None):
+    """Wrap already-encoded JSON bytes in a Flask response without re-serializing"""
+    if response_class is None:
+        from flask import current_app
+        response_class = current_app.response_class
+    return response_class(body, status=status, mimetype='application/json')
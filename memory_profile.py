@@ -0,0 +1,177 @@
+import os
+import sys
+import time
+import random
+import threading
+import tracemalloc
+from collections import deque
+
+# Deep sizes are measured on at most SAMPLE_ENTRIES entries of a structure and scaled up, so a
+# report over a large cache stays in the milliseconds
+SAMPLE_ENTRIES = 200
+TOP_SITES = 10
+# Objects per sampled entry whose allocation traceback is looked up
+TRACED_OBJECTS_PER_ENTRY = 50
+
+
+def _children(obj):
+    if isinstance(obj, dict):
+        return list(obj.keys()) + list(obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return list(obj)
+    children = []
+    if hasattr(obj, '__dict__'):
+        children.append(obj.__dict__)
+    for slot in getattr(type(obj), '__slots__', ()):
+        if hasattr(obj, slot):
+            children.append(getattr(obj, slot))
+    return children
+
+
+def deep_objects(obj, seen):
+    """Every object reachable from obj through containers and instance attributes, once"""
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, (type, type(sys), type(_children))):
+            continue
+        seen.add(id(current))
+        yield current
+        if not isinstance(current, (str, bytes, bytearray, int, float, bool)):
+            stack.extend(_children(current))
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate bytes held by obj and everything it references (shared objects counted once)"""
+    seen = set() if seen is None else seen
+    return sum(sys.getsizeof(o) for o in deep_objects(obj, seen))
+
+
+def _sample(mapping):
+    keys = list(mapping.keys())
+    if len(keys) <= SAMPLE_ENTRIES:
+        return keys, 1.0
+    return random.sample(keys, SAMPLE_ENTRIES), len(keys) / SAMPLE_ENTRIES
+
+
+def _site(traceback):
+    frame = traceback[-1]  # the allocating frame
+    return f'{frame.filename}:{frame.lineno}'
+
+
+def footprint(mapping, parts=None):
+    """Entry count and approximate deep size of a dict-like structure
+
+    parts maps a name to a function returning one component of an entry (e.g. the encoded
+    bodies of a cache entry), reported separately. With tracemalloc running, the sites that
+    allocated the sampled entries are included, weighted by size. Objects shared with another
+    structure (e.g. products held by two caches) count towards both.
+    """
+    keys, scale = _sample(mapping)
+    seen = set()
+    total = 0
+    part_sizes = {name: 0 for name in (parts or {})}
+    sites = {}
+    tracing = tracemalloc.is_tracing()
+    for key in keys:
+        value = mapping.get(key)
+        if value is None:
+            continue
+        objects = []
+        for name, getter in (parts or {}).items():
+            try:
+                part = list(deep_objects(getter(value), seen))
+            except Exception:
+                continue
+            part_sizes[name] += sum(sys.getsizeof(o) for o in part)
+            objects.extend(part)
+        rest = list(deep_objects(key, seen)) + list(deep_objects(value, seen))
+        total += sum(sys.getsizeof(o) for o in rest)
+        objects.extend(rest)
+        if tracing:
+            # An evenly spaced sample of the entry's objects, weighted up to the entry's size
+            step = max(1, len(objects) // TRACED_OBJECTS_PER_ENTRY)
+            for o in objects[::step]:
+                traceback = tracemalloc.get_object_traceback(o)
+                if traceback is not None:
+                    site = _site(traceback)
+                    sites[site] = sites.get(site, 0) + sys.getsizeof(o) * step
+    total += sum(part_sizes.values())
+
+    report = {
+        'entries': len(mapping),
+        'sampled': len(keys),
+        'approx_bytes': int(total * scale),
+    }
+    if parts:
+        report['parts'] = {name: int(size * scale) for name, size in part_sizes.items()}
+    if tracing:
+        top = sorted(sites.items(), key=lambda item: item[1], reverse=True)[:TOP_SITES]
+        report['allocation_sites'] = [{'site': site, 'approx_bytes': int(size * scale)} for site, size in top]
+    return report
+
+
+def top_allocations(limit=TOP_SITES):
+    """Process-wide top allocation sites from a tracemalloc snapshot (None when not tracing)"""
+    if not tracemalloc.is_tracing():
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        'traced_bytes': current,
+        'peak_traced_bytes': peak,
+        'top_sites': [{'site': _site(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                      for stat in snapshot.statistics('lineno')[:limit]]
+    }
+
+
+class MemoryReporter:
+    """Footprint report over named in-process structures, optionally logged periodically
+
+    structures maps a name to (mapping, parts) - see footprint().
+    """
+
+    def __init__(self, structures, trace_frames=0, log_interval=0):
+        self.structures = structures
+        self.trace_frames = trace_frames
+        self.log_interval = log_interval
+        self.thread = None
+        self.stop_event = threading.Event()
+        if trace_frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(trace_frames)
+
+    def report(self, include_sites=True):
+        started = time.perf_counter()
+        structures = {}
+        for name, (mapping, parts) in self.structures.items():
+            structures[name] = footprint(mapping, parts)
+        report = {
+            'pid': os.getpid(),
+            'structures': structures,
+            'tracemalloc': top_allocations() if include_sites else None,
+        }
+        report['report_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return report
+
+    def start(self):
+        if self.log_interval <= 0 or (self.thread is not None and self.thread.is_alive()):
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='memory-report', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.wait(self.log_interval):
+            try:
+                report = self.report(include_sites=False)
+                summary = ', '.join(f"{name}={s['entries']} entries/{s['approx_bytes'] / 1048576:.1f}MB"
+                                    for name, s in report['structures'].items())
+                print(f"🧠 Memory [{report['pid']}]: {summary}")
+            except Exception as e:
+                print(f"⚠️ Memory report failed: {e}")
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import threading
+
+# Archive layout:
+#   blobs/<2 hex>/<key>.z : zlib-compressed page bytes, named by the blake2b hash of the raw page
+#   manifest.ndjson       : one line per fetch (platform, query, page, url, time, key, parse counts)
+# Identical pages are stored once; the manifest keeps every fetch that referenced them.
+COMPRESSION_LEVEL = 6
+MANIFEST_NAME = 'manifest.ndjson'
+
+
+def content_key(content):
+    return hashlib.blake2b(content, digest_size=20).hexdigest()
+
+
+def blob_path(directory, key):
+    return os.path.join(directory, 'blobs', key[:2], key + '.z')
+
+
+def read_page(directory, key):
+    """Raw page bytes for a content key (KeyError once evicted)"""
+    try:
+        with open(blob_path(directory, key), 'rb') as f:
+            return zlib.decompress(f.read())
+    except FileNotFoundError:
+        raise KeyError(key)
+
+
+def parse_summary(products):
+    """Counts stored with each fetch so a replay can show what a parser change gained or lost"""
+    return {
+        'products': len(products),
+        'missing_titles': sum(1 for p in products if p.get('title') in (None, '', 'N/A')),
+        'missing_prices': sum(1 for p in products if not p.get('price')),
+    }
+
+
+class PageArchive:
+    """Content-addressed, compressed store of raw retailer result pages with a size cap"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(directory, 'blobs')
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.total_bytes = sum(size for _, _, size in self._blobs())
+        self.stored = 0
+        self.deduplicated = 0
+
+    def _blob_path(self, key):
+        return blob_path(self.directory, key)
+
+    def _blobs(self):
+        """(path, mtime, size) of every stored page"""
+        entries = []
+        for root, _, names in os.walk(self.blob_dir):
+            for name in names:
+                if not name.endswith('.z'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def store(self, platform, query, page, url, content, products=None):
+        """Archive one fetched page; returns its content key"""
+        key = content_key(content)
+        path = self._blob_path(key)
+        if os.path.exists(path):
+            os.utime(path)  # recently referenced pages survive eviction
+            self.deduplicated += 1
+        else:
+            data = zlib.compress(content, COMPRESSION_LEVEL)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.stored += 1
+            with self.lock:
+                self.total_bytes += len(data)
+                if self.total_bytes > self.max_bytes:
+                    self._evict()
+
+        record = {
+            'key': key,
+            'platform': platform,
+            'query': query,
+            'page': page,
+            'url': url,
+            'fetched_at': time.time(),
+            'size': len(content)
+        }
+        if products is not None:
+            record['parsed'] = parse_summary(products)
+        # One O_APPEND write per line keeps concurrent workers from interleaving records
+        fd = os.open(self.manifest_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+        finally:
+            os.close(fd)
+        return key
+
+    def _evict(self):
+        """Delete least recently referenced pages until the archive is 90% of its budget"""
+        blobs = sorted(self._blobs(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in blobs)
+        target = self.max_bytes * 0.9
+        for path, _, size in blobs:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self.total_bytes = total
+        self._prune_manifest()
+
+    def _prune_manifest(self):
+        """Drop manifest records of evicted pages (best effort - a line appended meanwhile may be lost)"""
+        kept = [line for line in self._manifest_lines()
+                if os.path.exists(self._blob_path(json.loads(line)['key']))]
+        tmp_path = f"{self.manifest_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.writelines(kept)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _manifest_lines(self):
+        try:
+            with open(self.manifest_path, 'rb') as f:
+                # A torn final line from a crashed writer is skipped
+                return [line for line in f if line.endswith(b'\n')]
+        except FileNotFoundError:
+            return []
+
+    def load(self, key):
+        return read_page(self.directory, key)
+
+    def entries(self, platform=None, since=None):
+        """Manifest records whose page is still archived, oldest first"""
+        for line in self._manifest_lines():
+            record = json.loads(line)
+            if platform and record['platform'] != platform:
+                continue
+            if since and record['fetched_at'] < since:
+                continue
+            if os.path.exists(self._blob_path(record['key'])):
+                yield record
+
+    def stats(self):
+        return {
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'stored': self.stored,
+            'deduplicated': self.deduplicated
+        }
@@ -0,0 +1,109 @@
+import os
+import sys
+import importlib
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from deadlines import DeadlineExceeded, clamp_timeout
+
+# Products cross the process boundary as tuples in this field order
+PRODUCT_FIELDS = ('title', 'price', 'rating', 'reviews', 'url', 'image', 'platform', 'platform_icon')
+
+# Pages smaller than this are parsed in-process - the round trip would cost more than it saves
+MIN_OFFLOAD_BYTES = 256 * 1024
+PARSE_TIMEOUT = 30  # seconds
+
+
+def _attach(name):
+    # Parse processes share the parent's resource tracker, so attaching does not add a second
+    # registration; only the creating process unlinks the segment
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def parse_shared_page(module, platform, name, size, max_results):
+    """Parse-process side: read the page from shared memory and return compact product tuples"""
+    parsers = importlib.import_module(module)
+    shm = _attach(name)
+    try:
+        content = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+    products = parsers.PLATFORM_PARSERS[platform](content, max_results)
+    return [tuple(p.get(field) for field in PRODUCT_FIELDS) for p in products]
+
+
+class ParsePool:
+    """Offloads large result pages to parse processes so parsing does not hold the worker's GIL
+
+    Raw bytes travel through shared memory (one copy in, no pickling of the page); the
+    processes come from a forkserver that has already imported the parser module.
+    """
+
+    def __init__(self, size, parsers_module, min_bytes=MIN_OFFLOAD_BYTES):
+        self.size = size
+        self.parsers_module = parsers_module
+        self.min_bytes = min_bytes
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pid = None
+        self.offloaded = 0
+        self.inline = 0
+        self.failures = 0
+
+    def _executor(self):
+        with self.lock:
+            if self.executor is None or self.pid != os.getpid():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload([self.parsers_module])
+                self.executor = ProcessPoolExecutor(max_workers=self.size, mp_context=context)
+                self.pid = os.getpid()
+            return self.executor
+
+    def _reset(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def parse(self, platform, content, max_results, parser):
+        """Parse a page, in a parse process when it is large enough, else with `parser` in-process"""
+        if self.size <= 0 or len(content) < self.min_bytes:
+            self.inline += 1
+            return parser(content, max_results)
+
+        shm = shared_memory.SharedMemory(create=True, size=len(content))
+        try:
+            shm.buf[:len(content)] = content
+            future = self._executor().submit(parse_shared_page, self.parsers_module, platform,
+                                             shm.name, len(content), max_results)
+            try:
+                rows = future.result(timeout=clamp_timeout(PARSE_TIMEOUT))
+            except FutureTimeout:
+                future.cancel()
+                raise DeadlineExceeded(f"Parsing {platform} did not finish in time")
+            except BrokenProcessPool as e:
+                # A parse process died (e.g. OOM); start a fresh pool next time and parse here
+                print(f"⚠️ Parse pool broken ({e}); parsing in-process")
+                self.failures += 1
+                self._reset()
+                self.inline += 1
+                return parser(content, max_results)
+        finally:
+            shm.close()
+            shm.unlink()
+        self.offloaded += 1
+        return [dict(zip(PRODUCT_FIELDS, row)) for row in rows]
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'min_bytes': self.min_bytes,
+            'offloaded': self.offloaded,
+            'inline': self.inline,
+            'failures': self.failures
+        }
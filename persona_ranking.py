@@ -0,0 +1,136 @@
+import os
+import heapq
+import bisect
+import itertools
+
+from persona_scoring import load_personas
+
+# Personas shared by every ranking; PERSONAS_FILE adds or overrides declarations (see persona_scoring)
+PERSONAS = load_personas(os.environ.get('PERSONAS_FILE') or None)
+
+# User preference -> persona whose top product is the final recommendation
+# (a preference naming a persona selects that persona)
+PREFERENCE_PERSONAS = {'premium': 'premium', 'budget': 'budget'}
+DEFAULT_PERSONA = 'value'
+
+
+def _price(product):
+    """Positive float price, 0 when missing or malformed"""
+    try:
+        return float(product.get('price') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class TopK:
+    """The k largest entries seen so far, in a min-heap (O(log k) per insert)"""
+
+    def __init__(self, k):
+        self.k = k
+        self.heap = []
+
+    def push(self, entry):
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def ranked(self):
+        return sorted(self.heap, reverse=True)
+
+
+class PersonaRanking:
+    """Per-persona top-k shortlists kept current as products arrive
+
+    Every product is scored for all personas in one fused pass (persona_scoring). Adding a
+    product costs O(personas * log k); reading a shortlist or switching the preference only
+    sorts the k kept entries, so nothing is re-filtered or re-sorted. Price percentiles are
+    exact for the initial products; later insertions are placed against the prices seen so far.
+    """
+
+    def __init__(self, products=(), top_n=4, personas=None):
+        self.top_n = top_n
+        self.personas = personas or PERSONAS
+        self.products = []
+        self.prices = []  # sorted positive prices, for price_percentile
+        self.sequence = itertools.count()
+        self.errors = {}  # persona -> last scoring error; failing products are left out of its shortlist
+        self.eligible = {name: TopK(top_n) for name in self.personas.names}
+        self.fallback = {name: TopK(top_n) for name in self.personas.names
+                         if self.personas.fallback[name] == 'rank_all'}
+        products = list(products)
+        if self.personas.needs_percentile:
+            self.prices = sorted(price for price in map(_price, products) if price > 0)
+        for product in products:
+            self._insert(product)
+
+    def price_percentile(self, price):
+        if price <= 0 or len(self.prices) < 2:
+            return 0.5
+        return min(bisect.bisect_left(self.prices, price) / (len(self.prices) - 1), 1.0)
+
+    def _insert(self, product):
+        index = len(self.products)
+        self.products.append(product)
+        tie = -next(self.sequence)  # earlier products win ties
+        try:
+            scores = self.personas.score(product, self.price_percentile)
+        except Exception:
+            scores = self._score_isolated(product)
+        for name, score in zip(self.personas.names, scores):
+            if score is None:
+                continue
+            eligible, key = score
+            entry = (key, tie, index)
+            if eligible:
+                self.eligible[name].push(entry)
+            if name in self.fallback:
+                self.fallback[name].push(entry)
+
+    def _score_isolated(self, product):
+        """Score each persona on its own so one failing declaration only affects itself"""
+        scores = []
+        for name, score in zip(self.personas.names, self.personas.score_each):
+            try:
+                scores.append(score(product, self.price_percentile))
+            except Exception as e:
+                self.errors[name] = f'{type(e).__name__}: {e}'
+                scores.append(None)
+        return scores
+
+    def add(self, product):
+        if self.personas.needs_percentile and _price(product) > 0:
+            bisect.insort(self.prices, _price(product))
+        self._insert(product)
+
+    def extend(self, products):
+        for product in products:
+            self.add(product)
+
+    def top(self, persona, n=None):
+        """Best n products for a persona (n <= top_n)"""
+        n = self.top_n if n is None else min(n, self.top_n)
+        entries = self.eligible[persona].ranked()
+        if not entries:
+            if persona in self.fallback:
+                entries = self.fallback[persona].ranked()
+            else:
+                return self.products[:1][:n]
+        return [self.products[index] for _, _, index in entries[:n]]
+
+    def persona_for(self, preference):
+        if preference in self.eligible:
+            return preference
+        return PREFERENCE_PERSONAS.get(preference, DEFAULT_PERSONA)
+
+    def final(self, preference):
+        """Final recommendation for a user preference"""
+        shortlist = self.top(self.persona_for(preference), 1)
+        return shortlist[0] if shortlist else None
+
+    def shortlists(self, n=None, exclude=()):
+        """{persona: top n} for every persona not in `exclude`"""
+        return {name: self.top(name, n) for name in self.personas.names if name not in exclude}
+
+    def __len__(self):
+        return len(self.products)
@@ -0,0 +1,132 @@
+import json
+import math
+
+# Personas are declared as data and compiled into a single function that scores a product
+# for every persona at once. Each persona has:
+#   label    : display name
+#   score    : list of tiers compared in order; each tier is {feature: weight} summed
+#   filters  : eligibility rules (see FILTERS); ineligible products only appear via the fallback
+#   fallback : 'rank_all' ranks every product when none is eligible, 'first' picks the first one
+#
+# The first three reproduce the original premiummax, budgetbalance and neutral persona_debate.
+DEFAULT_PERSONAS = {
+    'premium': {
+        'label': 'PremiumMax',
+        'score': [{'rating': 1}, {'price': -1}],
+        'filters': {'min_rating': 3.5, 'priced': True},
+        'fallback': 'rank_all'
+    },
+    'budget': {
+        'label': 'BudgetBalance',
+        'score': [{'price': -1}, {'rating': 1}],
+        'filters': {'min_rating': 2.5, 'priced': True},
+        'fallback': 'rank_all'
+    },
+    'value': {
+        'label': 'Best value',
+        'score': [{'value_for_money': 1}],
+        'filters': {'rated': True, 'priced': True},
+        'fallback': 'first'
+    },
+    'popular': {
+        'label': 'CrowdFavourite',
+        'score': [{'review_count': 1, 'rating': 0.5, 'price_percentile': -0.5}],
+        'filters': {'min_rating': 3.0},
+        'fallback': 'rank_all'
+    }
+}
+
+# feature -> expression over the locals set up in the generated function
+FEATURES = {
+    'rating': 'rating',
+    'price': 'price',
+    'price_percentile': 'price_percentile(price)',  # 0 = cheapest, 1 = most expensive
+    'review_count': "log1p(float(p.get('reviews') or 0))",
+    'value_for_money': 'rating / (price + 1)',
+    'offer_count': "float(p.get('offer_count') or 1)",
+}
+# "platform:<Name>" features are 1 for products from that platform, else 0
+
+# Locals every generated scoring function starts with
+PREAMBLE = [
+    "    rating = float(p.get('rating') or 0)",
+    "    price = float(p.get('price') or 0)",
+    "    platform = p.get('platform')",
+]
+
+FILTERS = {
+    'min_rating': lambda value: f'rating >= {float(value)!r}',
+    'max_rating': lambda value: f'rating <= {float(value)!r}',
+    'min_price': lambda value: f'price >= {float(value)!r}',
+    'max_price': lambda value: f'price <= {float(value)!r}',
+    'min_reviews': lambda value: f"float(p.get('reviews') or 0) >= {float(value)!r}",
+    'priced': lambda value: 'price > 0' if value else 'True',
+    'rated': lambda value: 'rating > 0' if value else 'True',
+    'platforms': lambda value: f'platform in {tuple(str(v) for v in value)!r}',
+}
+
+
+def _feature_expression(feature):
+    if feature.startswith('platform:'):
+        return f'(platform == {feature.split(":", 1)[1]!r})'
+    if feature not in FEATURES:
+        raise ValueError(f"Unknown persona feature '{feature}'")
+    return FEATURES[feature]
+
+
+def _tier_expression(tier):
+    terms = [f'{float(weight)!r} * {_feature_expression(feature)}'
+             for feature, weight in tier.items() if float(weight) != 0]
+    return ' + '.join(terms) or '0.0'
+
+
+class CompiledPersonas:
+    """Persona declarations compiled into one fused scoring function"""
+
+    def __init__(self, definitions):
+        if not definitions:
+            raise ValueError('At least one persona is required')
+        self.definitions = definitions
+        self.names = list(definitions)
+        self.labels = {name: d.get('label', name) for name, d in definitions.items()}
+        self.fallback = {name: d.get('fallback', 'rank_all') for name, d in definitions.items()}
+        self.source = self._generate()
+        namespace = {'log1p': math.log1p}
+        exec(compile(self.source, '<personas>', 'exec'), namespace)
+        self.score = namespace['score_personas']
+        # One function per persona, used to isolate a failing persona when the fused pass raises
+        self.score_each = [namespace[f'score_persona_{i}'] for i in range(len(self.names))]
+        self.needs_percentile = 'price_percentile(price)' in self.source
+
+    def _generate(self):
+        lines = ['def score_personas(p, price_percentile):'] + PREAMBLE + ['    return (']
+        single = []
+        for i, name in enumerate(self.names):
+            definition = self.definitions[name]
+            if self.fallback[name] not in ('rank_all', 'first'):
+                raise ValueError(f"Persona '{name}': fallback must be 'rank_all' or 'first'")
+            tiers = definition.get('score') or []
+            if isinstance(tiers, dict):
+                tiers = [tiers]
+            if not tiers:
+                raise ValueError(f"Persona '{name}' has no score")
+            filters = definition.get('filters') or {}
+            for rule in filters:
+                if rule not in FILTERS:
+                    raise ValueError(f"Persona '{name}': unknown filter '{rule}'")
+            eligible = ' and '.join(FILTERS[rule](value) for rule, value in filters.items()) or 'True'
+            key = ', '.join(_tier_expression(tier) for tier in tiers)
+            lines.append(f'        ({eligible}, ({key},)),  # {name!r}')
+            single += ['', f'def score_persona_{i}(p, price_percentile):  # {name!r}'] + PREAMBLE
+            single.append(f'    return ({eligible}, ({key},))')
+        lines.append('    )')
+        return '\n'.join(lines + single) + '\n'
+
+
+def load_personas(path=None):
+    """DEFAULT_PERSONAS, extended/overridden by a JSON file of the same shape"""
+    definitions = dict(DEFAULT_PERSONAS)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            definitions.update(json.load(f))
+    return CompiledPersonas(definitions)
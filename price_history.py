@@ -0,0 +1,342 @@
+import os
+import math
+import mmap
+import time
+import array
+import struct
+import hashlib
+import threading
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows - compaction is simply skipped
+    FCNTL_AVAILABLE = False
+
+# Segment file layout (little-endian):
+#   header  : magic, series count
+#   index   : (series id, byte offset, point count) per series, sorted by series id
+#   blocks  : per series, three columns of zigzag varints - timestamp deltas,
+#             price deltas (paise) and rating deltas (hundredths), first value absolute
+SEGMENT_MAGIC = b'PHS1'
+HEADER = struct.Struct('<4sI')
+INDEX_ENTRY = struct.Struct('<QQI')
+SEGMENT_SUFFIX = '.phs'
+
+# Points buffered in memory before the writer thread writes them out as a segment
+FLUSH_POINTS = 5000
+FLUSH_INTERVAL = 60  # seconds
+# Size-tiered compaction: segments up to TIER_BASE_BYTES are tier 0, each further tier is
+# MERGE_FACTOR times larger; MERGE_FACTOR segments of one tier merge into one of the next, so
+# every point is rewritten O(log n) times rather than on every compaction
+TIER_BASE_BYTES = 256 * 1024
+MERGE_FACTOR = 4
+
+
+def series_id(url):
+    """Stable 64-bit id for a product URL"""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _write_column(out, values):
+    previous = 0
+    for value in values:
+        delta = value - previous
+        previous = value
+        zigzag = delta * 2 if delta >= 0 else -delta * 2 - 1
+        while zigzag >= 0x80:
+            out.append((zigzag & 0x7F) | 0x80)
+            zigzag >>= 7
+        out.append(zigzag)
+
+
+def _read_columns(buf, offset, count, columns=3):
+    """Decode `columns` delta-encoded varint columns of `count` values starting at offset"""
+    result = []
+    for _ in range(columns):
+        values = []
+        previous = 0
+        for _ in range(count):
+            shift = 0
+            zigzag = 0
+            while True:
+                byte = buf[offset]
+                offset += 1
+                zigzag |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            delta = (zigzag >> 1) if not zigzag & 1 else -((zigzag + 1) >> 1)
+            previous += delta
+            values.append(previous)
+        result.append(values)
+    return result
+
+
+def segment_tier(size):
+    """Compaction tier of a segment file of `size` bytes"""
+    if size <= TIER_BASE_BYTES:
+        return 0
+    return int(math.log(size / TIER_BASE_BYTES, MERGE_FACTOR)) + 1
+
+
+def write_segment(path, series):
+    """Write {series id: (timestamps, prices, ratings)} as one immutable segment file"""
+    ids = sorted(series)
+    index_size = HEADER.size + INDEX_ENTRY.size * len(ids)
+    data = bytearray()
+    index = []
+    for sid in ids:
+        timestamps, prices, ratings = series[sid]
+        index.append((sid, index_size + len(data), len(timestamps)))
+        for column in (timestamps, prices, ratings):
+            _write_column(data, column)
+
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(SEGMENT_MAGIC, len(ids)))
+            for entry in index:
+                f.write(INDEX_ENTRY.pack(*entry))
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class Segment:
+    """Memory-mapped read-only view of a segment file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.buf, 0)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not a price history segment")
+
+    def lookup(self, sid):
+        """Binary search the index; returns (timestamps, prices, ratings) or None"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry_sid, offset, count = INDEX_ENTRY.unpack_from(self.buf, HEADER.size + mid * INDEX_ENTRY.size)
+            if entry_sid == sid:
+                return _read_columns(self.buf, offset, count)
+            if entry_sid < sid:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def all_series(self):
+        for i in range(self.count):
+            sid, offset, count = INDEX_ENTRY.unpack_from(self.buf, HEADER.size + i * INDEX_ENTRY.size)
+            yield sid, _read_columns(self.buf, offset, count)
+
+    def close(self):
+        self.buf.close()
+
+
+class PriceHistoryStore:
+    """Append-only (url, timestamp, price, rating) store with columnar delta-encoded segments
+
+    record() only appends to an in-memory buffer; a writer thread turns full buffers into
+    segments and merges segments of the same size tier.
+    """
+
+    def __init__(self, directory, flush_points=FLUSH_POINTS, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_points = flush_points
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.segments = {}  # file name -> Segment
+        self.pending = []  # buffers handed to flush() and not yet visible as a segment
+        self.wake = threading.Event()
+        self.writer = None
+        self.writer_pid = None
+        self._reset_buffer()
+
+    def _reset_buffer(self):
+        self.buf_sids = array.array('Q')
+        self.buf_ts = array.array('q')
+        self.buf_prices = array.array('q')
+        self.buf_ratings = array.array('q')
+        self.buffer_started = time.time()
+
+    def record(self, products, timestamp=None):
+        """Append one observation per product; cheap enough for the scrape hot path (no I/O)"""
+        ts = int(timestamp or time.time())
+        with self.lock:
+            for p in products:
+                url = p.get('url')
+                if not url or url == 'N/A':
+                    continue
+                self.buf_sids.append(series_id(url))
+                self.buf_ts.append(ts)
+                self.buf_prices.append(int(round(float(p.get('price') or 0) * 100)))
+                self.buf_ratings.append(int(round(float(p.get('rating') or 0) * 100)))
+            self._ensure_writer()
+            if len(self.buf_ts) >= self.flush_points:
+                self.wake.set()
+
+    def _ensure_writer(self):
+        # Called with self.lock held; the writer thread does not survive a fork
+        if self.writer is None or self.writer_pid != os.getpid() or not self.writer.is_alive():
+            self.writer_pid = os.getpid()
+            self.writer = threading.Thread(target=self._write_loop, name='price-history', daemon=True)
+            self.writer.start()
+
+    def _write_loop(self):
+        while True:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                if (len(self.buf_ts) >= self.flush_points
+                        or time.time() - self.buffer_started >= self.flush_interval):
+                    self.flush()
+                self.compact()
+            except Exception as e:
+                print(f"⚠️ Price history write failed: {e}")
+
+    def flush(self):
+        """Write buffered points out as a new segment"""
+        with self.lock:
+            if not len(self.buf_ts):
+                self.buffer_started = time.time()
+                return
+            columns = (self.buf_sids, self.buf_ts, self.buf_prices, self.buf_ratings)
+            self.pending.append(columns)
+            self._reset_buffer()
+
+        try:
+            sids, timestamps, prices, ratings = columns
+            series = {}
+            for i in sorted(range(len(sids)), key=lambda i: (sids[i], timestamps[i])):
+                entry = series.setdefault(sids[i], ([], [], []))
+                entry[0].append(timestamps[i])
+                entry[1].append(prices[i])
+                entry[2].append(ratings[i])
+            name = f"seg-{time.time_ns()}-{os.getpid()}{SEGMENT_SUFFIX}"
+            write_segment(os.path.join(self.directory, name), series)
+        except BaseException:
+            # Disk full, EIO, ...: put the points back in front of the buffer for the next flush
+            with self.lock:
+                self.pending = [c for c in self.pending if c is not columns]
+                for column, buffered in zip(columns, (self.buf_sids, self.buf_ts, self.buf_prices, self.buf_ratings)):
+                    column.extend(buffered)
+                self.buf_sids, self.buf_ts, self.buf_prices, self.buf_ratings = columns
+            raise
+        with self.lock:
+            self.pending = [c for c in self.pending if c is not columns]
+
+    def _segment_files(self):
+        return sorted(n for n in os.listdir(self.directory) if n.endswith(SEGMENT_SUFFIX))
+
+    def _open_segments(self):
+        """Map every segment on disk, including ones written by other workers"""
+        names = self._segment_files()
+        for name in list(self.segments):
+            if name not in names:
+                self.segments.pop(name).close()
+        for name in names:
+            if name not in self.segments:
+                try:
+                    self.segments[name] = Segment(os.path.join(self.directory, name))
+                except (OSError, ValueError):
+                    continue  # removed by a concurrent compaction
+        return [self.segments[n] for n in names if n in self.segments]
+
+    def _merge_candidates(self):
+        """Oldest MERGE_FACTOR segment names of the smallest tier that has that many, else None"""
+        tiers = {}
+        for name in self._segment_files():
+            try:
+                size = os.path.getsize(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            tiers.setdefault(segment_tier(size), []).append(name)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= MERGE_FACTOR:
+                return tiers[tier][:MERGE_FACTOR]
+        return None
+
+    def compact(self):
+        """Merge same-tier segments until no tier has MERGE_FACTOR of them; one worker at a time
+
+        Merging reads the immutable segment files without holding self.lock, so record() and
+        query() are only blocked while merged segments are swapped out.
+        """
+        if not FCNTL_AVAILABLE:
+            return
+        with open(os.path.join(self.directory, 'compact.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return  # another worker is already compacting
+            while True:
+                names = self._merge_candidates()
+                if names is None:
+                    return
+                self._merge(names)
+
+    def _merge(self, names):
+        segments = []
+        for name in names:
+            try:
+                segments.append(Segment(os.path.join(self.directory, name)))
+            except (OSError, ValueError):
+                continue
+        merged = {}
+        for segment in segments:
+            for sid, (timestamps, prices, ratings) in segment.all_series():
+                merged.setdefault(sid, []).extend(zip(timestamps, prices, ratings))
+            segment.close()
+        series = {}
+        for sid, points in merged.items():
+            points.sort()
+            series[sid] = tuple(list(column) for column in zip(*points))
+        name = f"seg-{time.time_ns()}-{os.getpid()}{SEGMENT_SUFFIX}"
+        write_segment(os.path.join(self.directory, name), series)
+        with self.lock:
+            for old in names:
+                segment = self.segments.pop(old, None)
+                if segment is not None:
+                    segment.close()
+                try:
+                    os.remove(os.path.join(self.directory, old))
+                except OSError:
+                    pass
+        print(f"🗜️ Merged {len(names)} price history segments ({sum(len(v) for v in merged.values())} points)")
+
+    def query(self, url, start=None, end=None):
+        """Observations for a URL between start and end (unix seconds), oldest first"""
+        sid = series_id(url)
+        start = start if start is not None else float('-inf')
+        end = end if end is not None else float('inf')
+        points = set()
+        with self.lock:
+            for segment in self._open_segments():
+                columns = segment.lookup(sid)
+                if columns:
+                    points.update(p for p in zip(*columns) if start <= p[0] <= end)
+            for sids, timestamps, prices, ratings in self.pending + [
+                    (self.buf_sids, self.buf_ts, self.buf_prices, self.buf_ratings)]:
+                for i in range(len(sids)):
+                    if sids[i] == sid and start <= timestamps[i] <= end:
+                        points.add((timestamps[i], prices[i], ratings[i]))
+        return [{'timestamp': ts, 'price': price / 100, 'rating': rating / 100} for ts, price, rating in sorted(points)]
+
+    def stats(self):
+        with self.lock:
+            segments = self._open_segments()
+            return {
+                'segments': len(segments),
+                'bytes_on_disk': sum(len(s.buf) for s in segments),
+                'buffered_points': len(self.buf_ts) + sum(len(columns[1]) for columns in self.pending)
+            }
@@ -0,0 +1,89 @@
+import math
+import bisect
+
+# Budget buckets offered by the question flow (product_questions) -> inclusive (min, max) price
+BUDGET_BANDS = {
+    'under_1000': (None, 1000),
+    '1000_5000': (1000, 5000),
+    '5000_15000': (5000, 15000),
+    '15000_30000': (15000, 30000),
+    'over_30000': (30000, None),
+}
+
+
+def _price(product):
+    try:
+        return float(product.get('price') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _rating(product):
+    try:
+        return float(product.get('rating') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_price_range(params):
+    """(min_price, max_price) from min_price/max_price or a budget_range bucket; None when unbounded
+
+    Explicit bounds narrow a budget_range. Raises ValueError for malformed values.
+    """
+    low = high = None
+    band = params.get('budget_range')
+    if band:
+        if not isinstance(band, str) or band not in BUDGET_BANDS:
+            raise ValueError(f"Unknown budget_range '{band}'")
+        low, high = BUDGET_BANDS[band]
+    for field in ('min_price', 'max_price'):
+        value = params.get(field)
+        if value in (None, ''):
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{field} must be a number')
+        if not math.isfinite(value):
+            raise ValueError(f'{field} must be a finite number')
+        if value < 0:
+            raise ValueError(f'{field} must not be negative')
+        if field == 'min_price':
+            low = value if low is None else max(low, value)
+        else:
+            high = value if high is None else min(high, value)
+    if low is None and high is None:
+        return None
+    if low is not None and high is not None and low > high:
+        raise ValueError('min_price is above max_price')
+    return (low, high)
+
+
+class PriceIndex:
+    """Products sorted by (price, -rating) once, so price-band queries cost O(log n + k)
+
+    Built when a product set is cached; every budget-filtered request against that set then
+    bisects instead of filtering and sorting the whole list.
+    """
+
+    def __init__(self, products):
+        order = sorted(range(len(products)), key=lambda i: (_price(products[i]), -_rating(products[i]), i))
+        self.products = [products[i] for i in order]
+        self.prices = [_price(p) for p in self.products]
+
+    def _bounds(self, min_price=None, max_price=None, priced=True):
+        low = bisect.bisect_right(self.prices, 0) if priced else 0
+        if min_price is not None:
+            low = max(low, bisect.bisect_left(self.prices, min_price))
+        high = len(self.prices) if max_price is None else bisect.bisect_right(self.prices, max_price)
+        return low, high
+
+    def within(self, min_price=None, max_price=None, limit=None, priced=True):
+        """Products priced in [min_price, max_price], cheapest first (unpriced ones only with priced=False)"""
+        low, high = self._bounds(min_price, max_price, priced)
+        if limit is not None:
+            high = min(high, low + limit)
+        return self.products[low:high]
+
+    def __len__(self):
+        return len(self.products)
@@ -0,0 +1,126 @@
+import re
+import zlib
+import random
+import unicodedata
+
+# MinHash signature of NUM_PERM values split into NUM_BANDS LSH bands
+NUM_PERM = 32
+NUM_BANDS = 8
+ROWS_PER_BAND = NUM_PERM // NUM_BANDS
+
+# Candidate pairs must share this fraction of title tokens to be merged
+SIMILARITY_THRESHOLD = 0.6
+# ...and their prices may differ by at most this factor
+MAX_PRICE_RATIO = 1.6
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)  # fixed seed keeps signatures identical across workers
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+STOPWORDS = {'a', 'an', 'and', 'the', 'for', 'with', 'of', 'in', 'by', 'to', 'on', 'new', 'latest', 'buy', 'online'}
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def title_tokens(title):
+    """Normalized token set of a product title"""
+    text = unicodedata.normalize('NFKD', title or '').encode('ascii', 'ignore').decode('ascii').lower()
+    return frozenset(t for t in TOKEN_PATTERN.findall(text) if t not in STOPWORDS)
+
+
+def minhash_signature(tokens):
+    """MinHash signature of a token set"""
+    hashes = [zlib.crc32(t.encode('utf-8')) for t in tokens]
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _prices_compatible(a, b):
+    if a <= 0 or b <= 0:
+        return True
+    return max(a, b) / min(a, b) <= MAX_PRICE_RATIO
+
+
+def find_duplicate_clusters(products):
+    """Group indices of near-identical products listed on different platforms"""
+    tokens = [title_tokens(p.get('title')) for p in products]
+
+    # LSH: products sharing any band of their signature become candidate pairs
+    buckets = {}
+    for i, toks in enumerate(tokens):
+        if not toks or products[i].get('title') in (None, 'N/A'):
+            continue
+        signature = minhash_signature(toks)
+        for band in range(NUM_BANDS):
+            key = (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+            buckets.setdefault(key, []).append(i)
+
+    candidates = set()
+    for members in buckets.values():
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                candidates.add((members[x], members[y]))
+
+    scored = []
+    for i, j in candidates:
+        if products[i].get('platform') == products[j].get('platform'):
+            continue  # variants on the same platform are separate products
+        similarity = jaccard(tokens[i], tokens[j])
+        if similarity >= SIMILARITY_THRESHOLD and _prices_compatible(products[i].get('price', 0), products[j].get('price', 0)):
+            scored.append((similarity, i, j))
+
+    # Greedily merge the most similar pairs first, keeping at most one offer per platform
+    cluster_of = list(range(len(products)))
+    members = {i: [i] for i in range(len(products))}
+    for _, i, j in sorted(scored, reverse=True):
+        ci, cj = cluster_of[i], cluster_of[j]
+        if ci == cj:
+            continue
+        platforms_i = {products[k].get('platform') for k in members[ci]}
+        if any(products[k].get('platform') in platforms_i for k in members[cj]):
+            continue
+        for k in members[cj]:
+            cluster_of[k] = ci
+        members[ci].extend(members.pop(cj))
+
+    return sorted((sorted(m) for m in members.values()), key=lambda m: m[0])
+
+
+def merge_offers(products):
+    """Combine listings of the same product into one entry with per-platform offers"""
+    # Cheapest priced offer first; listings without a price go last
+    order = sorted(range(len(products)), key=lambda k: (products[k].get('price', 0) <= 0, products[k].get('price', 0)))
+    offers = [{
+        'platform': products[k].get('platform'),
+        'platform_icon': products[k].get('platform_icon'),
+        'price': products[k].get('price', 0),
+        'rating': products[k].get('rating', 0),
+        'url': products[k].get('url'),
+        'image': products[k].get('image', '')
+    } for k in order]
+
+    # The cheapest offer represents the product, including its own rating - a better-rated listing
+    # elsewhere is still visible in `offers` but does not lift the cheap one's score
+    best = products[order[0]]
+    merged = dict(best)
+    merged['image'] = best.get('image') or next((o['image'] for o in offers if o['image']), '')
+    merged['offers'] = offers
+    merged['offer_count'] = len(offers)
+    return merged
+
+
+def merge_duplicate_products(products):
+    """Collapse cross-platform duplicates, preserving the order of first appearance"""
+    if len(products) < 2:
+        return products
+    merged = []
+    for cluster in find_duplicate_clusters(products):
+        if len(cluster) == 1:
+            merged.append(products[cluster[0]])
+        else:
+            merged.append(merge_offers([products[i] for i in cluster]))
+    return merged
@@ -1,6 +1,8 @@
 import random
 from datetime import datetime
 
+from price_index import BUDGET_BANDS
+
 class ProductQuestioner:
     def __init__(self):
         self.question_flow = []
@@ -216,6 +218,10 @@ class ProductQuestioner:
             'preferences': self.user_responses,
             'recommendation_approach': self.get_recommendation_approach()
         }
+        # The budget answer as /api/scrape min_price/max_price bounds
+        band = BUDGET_BANDS.get(self.user_responses.get('budget_range'))
+        if band is not None:
+            summary['price_range'] = {'min_price': band[0], 'max_price': band[1]}
         return summary
     
     def get_recommendation_approach(self):
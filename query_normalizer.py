@@ -0,0 +1,108 @@
+import threading
+import unicodedata
+
+# Search queries are canonicalized before they become cache keys, so "Laptop", "laptop " and
+# "laptops" share one cache entry, one refresh lease and one scrape. The user's own wording is
+# still what gets sent to the retailers; only the key is canonical.
+MARK_CATEGORIES = ('Mn', 'Mc', 'Me')
+WORD_JOINERS = "-'."
+
+# Plurals the suffix rules below would get wrong
+PLURAL_EXCEPTIONS = {'news': 'news', 'series': 'series', 'species': 'species'}
+# Words ending in s that are not plurals
+SINGULAR_ENDINGS = ('ss', 'us', 'is', 'ous', "'s")
+MIN_STEM_LENGTH = 4
+
+
+def fold_text(text):
+    """NFKC, case-folded, with accents removed from Latin letters ("Café" -> "cafe")"""
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    decomposed = unicodedata.normalize('NFKD', text)
+    kept = []
+    for char in decomposed:
+        # Combining marks on other scripts (e.g. Devanagari vowel signs) carry meaning
+        if unicodedata.combining(char) and kept and kept[-1].isascii():
+            continue
+        kept.append(char)
+    return unicodedata.normalize('NFC', ''.join(kept))
+
+
+def singularize(token):
+    """Light plural stemming for English retail terms ("batteries" -> "battery", "watches" -> "watch")"""
+    if token in PLURAL_EXCEPTIONS:
+        return PLURAL_EXCEPTIONS[token]
+    if '-' in token:
+        # "t-shirts" -> "t-shirt"
+        head, _, last = token.rpartition('-')
+        return f'{head}-{singularize(last)}'
+    if len(token) <= MIN_STEM_LENGTH - 1 or not token.isalpha() or not token.endswith('s'):
+        return token
+    if token.endswith(SINGULAR_ENDINGS):
+        return token
+    if token.endswith('ies') and len(token) > MIN_STEM_LENGTH:
+        return token[:-3] + 'y'
+    if token.endswith(('ches', 'shes', 'xes', 'zes', 'sses')):
+        return token[:-2]
+    return token[:-1]
+
+
+def split_words(text):
+    """Alphanumeric runs, keeping combining marks (Indic vowel signs) and inner -'. inside the word"""
+    tokens, current = [], []
+    for char in text:
+        if char.isalnum() or (current and unicodedata.category(char) in MARK_CATEGORIES):
+            current.append(char)
+        elif char in WORD_JOINERS and current:
+            current.append(char)
+        elif current:
+            tokens.append(''.join(current).rstrip(WORD_JOINERS))
+            current = []
+    if current:
+        tokens.append(''.join(current).rstrip(WORD_JOINERS))
+    return [token for token in tokens if token]
+
+
+def query_tokens(search_query):
+    """Folded, singularized tokens of a query in their original order"""
+    return [singularize(token) for token in split_words(fold_text(search_query))]
+
+
+def canonical_query(search_query):
+    """Cache-key form of a query: tokens as a sorted bag of words
+
+    A query containing double quotes is a phrase and keeps its token order.
+    """
+    tokens = query_tokens(search_query)
+    if '"' not in (search_query or ''):
+        tokens.sort()
+    return ' '.join(tokens)
+
+
+class NormalizationStats:
+    """Cache hit ratio, with the hits that only matched because of normalization broken out"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.normalized_hits = 0  # the cached entry was produced by a different raw query
+
+    def record(self, hit, raw_query=None, cached_query=None):
+        with self.lock:
+            self.lookups += 1
+            if hit:
+                self.hits += 1
+                if cached_query is not None and cached_query != raw_query:
+                    self.normalized_hits += 1
+
+    def stats(self):
+        with self.lock:
+            lookups, hits, normalized = self.lookups, self.hits, self.normalized_hits
+        return {
+            'lookups': lookups,
+            'hits': hits,
+            'normalized_hits': normalized,
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+            # What the ratio would have been with raw (whitespace-collapsed) query keys
+            'raw_hit_ratio': round((hits - normalized) / lookups, 4) if lookups else None
+        }
@@ -0,0 +1,176 @@
+import os
+import time
+import heapq
+import sqlite3
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Lower values are served first when scrapes queue up for the same host
+PRIORITY_USER = 0
+PRIORITY_BACKGROUND = 10
+
+# Priority of scrapes started from the current thread/context
+current_priority = contextvars.ContextVar('scrape_priority', default=PRIORITY_USER)
+
+
+@contextmanager
+def scrape_priority(priority):
+    """Run outbound scrapes inside the block with the given queue priority"""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a scrape waited longer than allowed for its turn"""
+
+
+class TokenBucket:
+    """In-process token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def try_take(self):
+        """Take a token; return 0 on success or the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class SharedTokenBucket:
+    """Token bucket stored in SQLite so every gunicorn worker draws from the same budget"""
+
+    def __init__(self, path, host, rate, capacity):
+        self.path = path
+        self.host = host
+        self.rate = rate
+        self.capacity = capacity
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS token_buckets (host TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or getattr(self.local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def try_take(self):
+        now = time.time()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated_at FROM token_buckets WHERE host = ?', (self.host,)).fetchone()
+            tokens = self.capacity if row is None else min(self.capacity, row[0] + (now - row[1]) * self.rate)
+            wait = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            conn.execute('INSERT OR REPLACE INTO token_buckets (host, tokens, updated_at) VALUES (?, ?, ?)',
+                         (self.host, tokens, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+class HostRateLimiter:
+    """Per-host token buckets with a priority queue of waiting scrapes
+
+    Each host has its own condition, so a slow shared-bucket (SQLite) transaction for one host
+    never holds up acquires for another.
+    """
+
+    def __init__(self, requests_per_minute=20, burst=5, limits=None, shared_path=None):
+        self.default_limit = (requests_per_minute, burst)
+        self.limits = limits or {}  # host -> (requests_per_minute, burst)
+        self.shared_path = shared_path
+        self.buckets = {}
+        self.waiters = {}  # host -> heap of (priority, sequence)
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()  # guards self.conditions only
+        self.conditions = {}  # host -> Condition guarding that host's bucket and queue
+        self.waited = {}  # host -> total seconds spent queueing
+
+    def _condition(self, host):
+        with self.lock:
+            condition = self.conditions.get(host)
+            if condition is None:
+                condition = self.conditions[host] = threading.Condition()
+            return condition
+
+    def _bucket(self, host):
+        # Called with the host's condition held
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            per_minute, burst = self.limits.get(host, self.default_limit)
+            if self.shared_path:
+                bucket = SharedTokenBucket(self.shared_path, host, per_minute / 60.0, burst)
+            else:
+                bucket = TokenBucket(per_minute / 60.0, burst)
+            self.buckets[host] = bucket
+        return bucket
+
+    def acquire(self, host, priority=None, timeout=None):
+        """Block until this request may hit `host`; raises RateLimitExceeded after `timeout` seconds"""
+        if priority is None:
+            priority = current_priority.get()
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+
+        condition = self._condition(host)
+        with condition:
+            entry = (priority, next(self.sequence))
+            queue = self.waiters.setdefault(host, [])
+            heapq.heappush(queue, entry)
+            try:
+                while True:
+                    wait = None
+                    if queue[0] == entry:
+                        wait = self._bucket(host).try_take()
+                        if wait == 0:
+                            heapq.heappop(queue)
+                            self.waited[host] = self.waited.get(host, 0) + time.monotonic() - started
+                            return
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            queue.remove(entry)
+                            heapq.heapify(queue)
+                            raise RateLimitExceeded(f"Waited more than {timeout}s for a {host} request slot")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    condition.wait(wait)
+            finally:
+                # Let the next waiter re-check whether it is now at the head of the queue
+                condition.notify_all()
+
+    def stats(self):
+        with self.lock:
+            conditions = dict(self.conditions)
+        stats = {}
+        for host, condition in conditions.items():
+            with condition:
+                stats[host] = {'queued': len(self.waiters.get(host, [])),
+                               'seconds_waited': round(self.waited.get(host, 0), 3)}
+        return stats
@@ -0,0 +1,228 @@
+import os
+import time
+import random
+import sqlite3
+import threading
+from collections import deque
+
+# How quickly a query's popularity fades without new hits
+POPULARITY_HALF_LIFE = 600  # 10 minutes
+# Decayed score a query needs to count as popular: two hits within one half-life
+MIN_POPULARITY = 1.5
+
+
+class QueryPopularity:
+    """Exponentially decayed hit counts per cache key"""
+
+    def __init__(self, half_life=POPULARITY_HALF_LIFE, max_tracked=1000, min_score=MIN_POPULARITY):
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self.min_score = min_score
+        self.scores = {}  # cache_key -> [score, last_hit, params]
+        self.lock = threading.Lock()
+
+    def _decayed(self, score, last_hit, now):
+        return score * 0.5 ** ((now - last_hit) / self.half_life)
+
+    def record(self, cache_key, params):
+        """Count a hit for a query; params are what the refresh needs to re-run it"""
+        now = time.time()
+        with self.lock:
+            current = self.scores.get(cache_key)
+            score = self._decayed(current[0], current[1], now) if current else 0.0
+            self.scores[cache_key] = [score + 1.0, now, params]
+            if len(self.scores) > self.max_tracked:
+                self._prune(now)
+
+    def _prune(self, now):
+        # Keep the most popular half once the table grows past its limit
+        ranked = sorted(self.scores.items(), key=lambda kv: self._decayed(kv[1][0], kv[1][1], now), reverse=True)
+        self.scores = dict(ranked[:self.max_tracked // 2])
+
+    def top(self, n):
+        """Return [(cache_key, params, score)] for the n most popular queries scoring at least min_score
+
+        Queries below min_score with no hit for a half-life are forgotten.
+        """
+        now = time.time()
+        with self.lock:
+            ranked = []
+            for key, value in list(self.scores.items()):
+                score = self._decayed(value[0], value[1], now)
+                if score >= self.min_score:
+                    ranked.append((key, value[2], score))
+                elif now - value[1] >= self.half_life:
+                    del self.scores[key]
+        ranked.sort(key=lambda item: item[2], reverse=True)
+        return ranked[:n]
+
+
+class RefreshCoordinator:
+    """SQLite-backed leases and shared results so gunicorn workers cooperate on refreshes"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS refresh_leases (
+                cache_key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS shared_results (
+                cache_key TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                body BLOB NOT NULL
+            );
+        """)
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or getattr(self.local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def claim(self, cache_key, lease_seconds):
+        """Atomically take the refresh lease for a key; False if another worker holds it"""
+        now = time.time()
+        conn = self._connection()
+        cur = conn.execute(
+            'INSERT INTO refresh_leases (cache_key, owner, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(cache_key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at '
+            'WHERE refresh_leases.expires_at <= ?',
+            (cache_key, f"{os.getpid()}:{threading.get_ident()}", now + lease_seconds, now)
+        )
+        return cur.rowcount == 1
+
+    def publish(self, cache_key, body, created_at):
+        """Share an encoded search result with the other workers"""
+        self._connection().execute(
+            'INSERT OR REPLACE INTO shared_results (cache_key, created_at, body) VALUES (?, ?, ?)',
+            (cache_key, created_at, body)
+        )
+
+    def fetch(self, cache_key, max_age):
+        """Return (body, created_at) for a shared result younger than max_age, else None"""
+        row = self._connection().execute(
+            'SELECT body, created_at FROM shared_results WHERE cache_key = ? AND created_at > ?',
+            (cache_key, time.time() - max_age)
+        ).fetchone()
+        return (bytes(row[0]), row[1]) if row else None
+
+    def purge(self, max_age):
+        """Delete expired leases and shared results"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute('DELETE FROM refresh_leases WHERE expires_at <= ?', (now,))
+        conn.execute('DELETE FROM shared_results WHERE created_at <= ?', (now - max_age,))
+
+
+class PlatformBudget:
+    """Sliding one-minute budget of background scrapes per platform"""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.history = {}  # platform -> deque of timestamps
+        self.lock = threading.Lock()
+
+    def _window(self, platform, now):
+        window = self.history.setdefault(platform, deque())
+        while window and now - window[0] > 60:
+            window.popleft()
+        return window
+
+    def available(self, platforms):
+        """True if every platform still has budget left this minute"""
+        now = time.time()
+        with self.lock:
+            return all(len(self._window(p, now)) < self.per_minute for p in platforms)
+
+    def spend(self, platforms):
+        """Record one request against every platform"""
+        now = time.time()
+        with self.lock:
+            for platform in platforms:
+                self._window(platform, now).append(now)
+
+
+class RefreshScheduler:
+    """Re-scrapes the most popular queries shortly before their cache entries expire"""
+
+    def __init__(self, popularity, coordinator, refresh_fn, remaining_ttl_fn, platforms_fn,
+                 cache_timeout, top_n=20, refresh_ahead=60, interval=30, budget_per_minute=6, jitter=5.0):
+        self.popularity = popularity
+        self.coordinator = coordinator
+        self.refresh_fn = refresh_fn
+        self.remaining_ttl_fn = remaining_ttl_fn
+        self.platforms_fn = platforms_fn
+        self.cache_timeout = cache_timeout
+        self.top_n = top_n
+        self.refresh_ahead = refresh_ahead
+        self.interval = interval
+        self.budget = PlatformBudget(budget_per_minute)
+        self.jitter = jitter
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.refreshed = 0
+        self.skipped = 0
+
+    def start(self):
+        """Start the scheduler thread (once per worker process)"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='refresh-scheduler', daemon=True)
+        self.thread.start()
+        print(f"🔄 Refresh scheduler started (top {self.top_n} queries every {self.interval}s)")
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        # Stagger workers so they do not all wake up at the same moment
+        self.stop_event.wait(random.uniform(0, self.interval))
+        while not self.stop_event.is_set():
+            try:
+                self.tick()
+                self.coordinator.purge(self.cache_timeout)
+            except Exception as e:
+                print(f"⚠️ Refresh scheduler error: {e}")
+            self.stop_event.wait(self.interval)
+
+    def tick(self):
+        """Refresh every popular query that is about to expire and is within budget"""
+        for cache_key, params, _ in self.popularity.top(self.top_n):
+            if self.stop_event.is_set():
+                return
+            if self.remaining_ttl_fn(cache_key) > self.refresh_ahead:
+                continue
+            platforms = self.platforms_fn(params)
+            if not self.budget.available(platforms):
+                self.skipped += 1
+                continue
+            # The lease lasts until the refreshed entry itself nears expiry
+            if not self.coordinator.claim(cache_key, max(self.cache_timeout - self.refresh_ahead, 1)):
+                continue
+            self.budget.spend(platforms)
+            self.stop_event.wait(random.uniform(0, self.jitter))
+            try:
+                self.refresh_fn(params)
+                self.refreshed += 1
+            except Exception as e:
+                print(f"⚠️ Scheduled refresh failed for {cache_key}: {e}")
+
+    def stats(self):
+        return {
+            'running': self.thread is not None and self.thread.is_alive(),
+            'tracked_queries': len(self.popularity.scores),
+            'refreshed': self.refreshed,
+            'skipped_over_budget': self.skipped
+        }
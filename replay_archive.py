@@ -0,0 +1,92 @@
+"""
+Re-run the current parsers over archived result pages (see page_archive.py) in parallel
+processes - validates selector changes and re-extracts data without touching the retailers.
+
+    python replay_archive.py [--archive DIR] [--platform amazon] [--since-hours 24]
+                             [--workers 4] [--limit N] [--output products.ndjson]
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+from page_archive import read_page, parse_summary, PageArchive
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARCHIVE = os.environ.get('PAGE_ARCHIVE_DIR') or os.path.join(ROOT, 'instance', 'page_archive')
+
+
+def replay_page(job):
+    """Parse one archived page with today's parsers (runs in a worker process)"""
+    directory, record, keep_products = job
+    import webscraper_fixed  # imported once per process
+
+    content = read_page(directory, record['key'])
+    # The parsers print a debug line per product; keep replay output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        products = webscraper_fixed.PLATFORM_PARSERS[record['platform']](content, None)
+    return record, parse_summary(products), products if keep_products else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay archived retailer pages through the current parsers')
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE)
+    parser.add_argument('--platform', choices=['amazon', 'flipkart', 'myntra'])
+    parser.add_argument('--since-hours', type=float)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--output', help='write re-extracted products as NDJSON')
+    args = parser.parse_args()
+
+    archive = PageArchive(args.archive, max_bytes=float('inf'))
+    since = time.time() - args.since_hours * 3600 if args.since_hours else None
+
+    # Each distinct page once (the latest fetch that referenced it)
+    records = {}
+    for record in archive.entries(args.platform, since):
+        records[(record['platform'], record['key'])] = record
+    jobs = [(args.archive, record, bool(args.output)) for record in records.values()][:args.limit]
+    if not jobs:
+        print("📭 No archived pages to replay")
+        return 1
+
+    print(f"🔁 Replaying {len(jobs)} archived pages with {args.workers} processes...")
+    started = time.time()
+    totals = {}
+    output = open(args.output, 'w', encoding='utf-8') if args.output else None
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for record, summary, products in pool.map(replay_page, jobs, chunksize=4):
+                before = record.get('parsed') or {}
+                platform = totals.setdefault(record['platform'], {
+                    'pages': 0, 'changed_pages': 0, 'products': [0, 0], 'missing_titles': [0, 0], 'missing_prices': [0, 0]
+                })
+                platform['pages'] += 1
+                for field in ('products', 'missing_titles', 'missing_prices'):
+                    platform[field][0] += before.get(field, 0)
+                    platform[field][1] += summary[field]
+                if before and before != summary:
+                    platform['changed_pages'] += 1
+                if output is not None:
+                    for product in products:
+                        output.write(json.dumps({'query': record['query'], 'page': record['page'], **product},
+                                                ensure_ascii=False) + '\n')
+    finally:
+        if output is not None:
+            output.close()
+
+    print(f"✅ Replayed in {time.time() - started:.1f}s (archived at fetch time → now)")
+    for name, platform in sorted(totals.items()):
+        print(f"   {name}: {platform['pages']} pages, {platform['changed_pages']} changed | "
+              f"products {platform['products'][0]} → {platform['products'][1]} | "
+              f"missing titles {platform['missing_titles'][0]} → {platform['missing_titles'][1]} | "
+              f"missing prices {platform['missing_prices'][0]} → {platform['missing_prices'][1]}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
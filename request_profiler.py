@@ -0,0 +1,242 @@
+import os
+import re
+import sys
+import time
+import secrets
+import functools
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Sampled request profiles: while a request is profiled, a sampler thread records the stack of
+# every thread working for it (the request thread plus its platform fan-out threads) every
+# INTERVAL seconds. Profiles are written in collapsed-stack format ("frame;frame;frame count"
+# per line), which flamegraph.pl, speedscope and inferno read directly.
+DEFAULT_INTERVAL = 0.005
+PROFILE_ID_PATTERN = re.compile(r'^[0-9a-f]{12}$')
+MAX_STACK_DEPTH = 64
+
+# The profile of the request this context belongs to (copied into fan-out threads)
+current_profile = contextvars.ContextVar('current_profile', default=None)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})'
+
+
+def collapse_stack(frame):
+    """Root-first 'a;b;c' stack of a frame"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class Profile:
+    """Stack samples of one request"""
+
+    def __init__(self, label):
+        self.id = secrets.token_hex(6)
+        self.label = ' '.join(str(label).split())
+        self.started = time.time()
+        self.duration = 0.0
+        self.samples = {}  # collapsed stack -> count
+        self.threads = {}  # thread ident -> nesting depth
+        self.lock = threading.Lock()
+
+    def enter_thread(self):
+        ident = threading.get_ident()
+        with self.lock:
+            self.threads[ident] = self.threads.get(ident, 0) + 1
+
+    def exit_thread(self):
+        ident = threading.get_ident()
+        with self.lock:
+            depth = self.threads.get(ident, 0) - 1
+            if depth > 0:
+                self.threads[ident] = depth
+            else:
+                self.threads.pop(ident, None)
+
+    def sample(self, frames):
+        with self.lock:
+            idents = list(self.threads)
+        stacks = [collapse_stack(frames[ident]) for ident in idents if ident in frames]
+        with self.lock:
+            for stack in stacks:
+                self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def collapsed(self):
+        with self.lock:
+            samples = sorted(self.samples.items(), key=lambda item: item[1], reverse=True)
+        return ''.join(f'{stack} {count}\n' for stack, count in samples)
+
+
+def profiled(fn):
+    """fn wrapped so its thread is sampled as part of the current request's profile
+
+    Returns fn itself when the request is not being profiled, so the common path costs one
+    ContextVar lookup.
+    """
+    profile = current_profile.get()
+    if profile is None:
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        profile.enter_thread()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.exit_thread()
+    return run
+
+
+class RequestProfiler:
+    """Profiles 1 in sample_rate requests (or forced ones) and keeps the last `keep` on disk
+
+    Profiles are files in `directory`, so any gunicorn worker can serve a download.
+    """
+
+    def __init__(self, directory, sample_rate=0, keep=20, interval=DEFAULT_INTERVAL):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.interval = interval
+        self.counter = itertools.count(1)
+        self.active = set()
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.thread = None
+        self.pid = None
+        self.profiled = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def should_profile(self, forced=False):
+        if forced:
+            return True
+        return self.sample_rate > 0 and next(self.counter) % self.sample_rate == 0
+
+    def _ensure_sampler(self):
+        # Called with self.lock held; the sampler thread does not survive a fork
+        if self.thread is None or self.pid != os.getpid() or not self.thread.is_alive():
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+            self.thread.start()
+
+    def _sample_loop(self):
+        while True:
+            with self.lock:
+                while not self.active:
+                    self.wake.wait()
+                profiles = list(self.active)
+            frames = sys._current_frames()
+            for profile in profiles:
+                profile.sample(frames)
+            del frames
+            time.sleep(self.interval)
+
+    @contextmanager
+    def profile(self, label):
+        """Sample the calling thread (and profiled() fan-out work) until the block exits"""
+        profile = Profile(label)
+        profile.enter_thread()
+        token = current_profile.set(profile)
+        with self.lock:
+            self._ensure_sampler()
+            self.active.add(profile)
+            self.wake.notify()
+        started = time.perf_counter()
+        try:
+            yield profile
+        finally:
+            profile.duration = time.perf_counter() - started
+            with self.lock:
+                self.active.discard(profile)
+            current_profile.reset(token)
+            profile.exit_thread()
+            try:
+                self._save(profile)
+            except OSError as e:
+                print(f"⚠️ Could not save profile {profile.id}: {e}")
+
+    def _path(self, profile_id):
+        if not PROFILE_ID_PATTERN.match(profile_id or ''):
+            raise KeyError(profile_id)
+        return os.path.join(self.directory, f'{profile_id}.collapsed')
+
+    def _save(self, profile):
+        path = self._path(profile.id)
+        header = (f'# label: {profile.label}\n# started: {profile.started:.3f}\n'
+                  f'# duration_ms: {profile.duration * 1000:.1f}\n# interval_ms: {self.interval * 1000:g}\n')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(header + profile.collapsed())
+        os.replace(tmp_path, path)
+        self.profiled += 1
+        self._prune()
+        print(f"🔬 Profiled '{profile.label}' in {profile.duration * 1000:.0f}ms "
+              f"({sum(profile.samples.values())} samples): {profile.id}")
+
+    def _files(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.collapsed'):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.stat(path).st_mtime, name[:-len('.collapsed')], path))
+                except OSError:
+                    continue
+        return sorted(entries, reverse=True)
+
+    def _prune(self):
+        for _, _, path in self._files()[self.keep:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _header(self, path):
+        info = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.startswith('# '):
+                    break
+                key, _, value = line[2:].rstrip('\n').partition(': ')
+                info[key] = value
+        return info
+
+    def recent(self):
+        """Stored profiles, newest first"""
+        profiles = []
+        for _, profile_id, path in self._files():
+            try:
+                info = self._header(path)
+            except OSError:
+                continue
+            profiles.append({
+                'id': profile_id,
+                'label': info.get('label'),
+                'started': float(info.get('started') or 0),
+                'duration_ms': float(info.get('duration_ms') or 0)
+            })
+        return profiles
+
+    def load(self, profile_id):
+        """Collapsed stacks of a stored profile without its header (KeyError when unknown)"""
+        try:
+            with open(self._path(profile_id), 'r', encoding='utf-8') as f:
+                return ''.join(line for line in f if not line.startswith('# '))
+        except FileNotFoundError:
+            raise KeyError(profile_id)
+
+    def stats(self):
+        return {
+            'sample_rate': self.sample_rate,
+            'keep': self.keep,
+            'interval_ms': self.interval * 1000,
+            'profiled': self.profiled
+        }
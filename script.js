@@ -1,7 +1,184 @@
+// Client data layer for the search API: same-origin requests, one live search per tab,
+// a short-lived response cache and streamed results when the backend offers them
+class SearchClient {
+    constructor(options = {}) {
+        // Relative by default so the page talks to the server that served it (no CORS preflight);
+        // set window.API_BASE_URL to point a separately hosted frontend at the backend
+        this.baseUrl = options.baseUrl ?? (window.API_BASE_URL || '');
+        this.cacheTtl = options.cacheTtl ?? 5 * 60 * 1000; // matches the server's CACHE_TIMEOUT
+        this.maxEntries = options.maxEntries ?? 50;
+        this.debounceMs = options.debounceMs ?? 300;
+        this.cache = new Map(); // key -> {data, storedAt}, oldest first
+        this.inflight = new Map(); // key -> promise, so identical searches share one request
+        this.controller = null;
+        this.debounceTimer = null;
+        this.pendingDebounce = null;
+        this.features = null;
+    }
+
+    static normalizeQuery(query) {
+        // Same spirit as the server's canonical query: Unicode/case/accent folding, collapsed
+        // whitespace and word order ignored
+        return query.normalize('NFKC').toLowerCase()
+            .normalize('NFKD').replace(/[\u0300-\u036f]/g, '')
+            .split(/\s+/).filter(Boolean).sort().join(' ');
+    }
+
+    cacheKey(query, params) {
+        const platforms = [...(params.platforms || [])].sort().join(',');
+        return `${SearchClient.normalizeQuery(query)}|${params.preference}|${params.max_results}|${platforms}`;
+    }
+
+    cached(key) {
+        const hit = this.cache.get(key);
+        if (!hit) return null;
+        if (Date.now() - hit.storedAt > this.cacheTtl) {
+            this.cache.delete(key);
+            return null;
+        }
+        // Re-insert to keep the Map in least-recently-used order
+        this.cache.delete(key);
+        this.cache.set(key, hit);
+        return hit.data;
+    }
+
+    store(key, data) {
+        this.cache.set(key, { data, storedAt: Date.now() });
+        while (this.cache.size > this.maxEntries) {
+            this.cache.delete(this.cache.keys().next().value);
+        }
+    }
+
+    async supportsStreaming() {
+        if (this.features === null) {
+            this.features = fetch(`${this.baseUrl}/api/health`)
+                .then(response => response.ok ? response.json() : {})
+                .then(health => health.features || [])
+                .catch(() => []);
+        }
+        return (await this.features).includes('search-stream');
+    }
+
+    cancel() {
+        if (this.controller) {
+            this.controller.abort();
+            this.controller = null;
+        }
+    }
+
+    // Resolves after the user stops re-triggering searches for debounceMs; superseded calls
+    // reject with an AbortError
+    searchDebounced(query, params, onProgress) {
+        clearTimeout(this.debounceTimer);
+        if (this.pendingDebounce) {
+            this.pendingDebounce.reject(new DOMException('Superseded', 'AbortError'));
+        }
+        return new Promise((resolve, reject) => {
+            this.pendingDebounce = { reject };
+            this.debounceTimer = setTimeout(() => {
+                this.pendingDebounce = null;
+                this.search(query, params, onProgress).then(resolve, reject);
+            }, this.debounceMs);
+        });
+    }
+
+    // Latest search wins: starting one aborts the request of the previous one
+    search(query, params, onProgress) {
+        const key = this.cacheKey(query, params);
+        const hit = this.cached(key);
+        if (hit) return Promise.resolve(hit);
+        if (this.inflight.has(key)) return this.inflight.get(key);
+
+        this.cancel();
+        const controller = new AbortController();
+        this.controller = controller;
+        const request = this.fetchResults(query, params, controller.signal, onProgress)
+            .then(data => {
+                this.store(key, data);
+                return data;
+            })
+            .finally(() => {
+                this.inflight.delete(key);
+                if (this.controller === controller) this.controller = null;
+            });
+        this.inflight.set(key, request);
+        return request;
+    }
+
+    async fetchResults(query, params, signal, onProgress) {
+        if (await this.supportsStreaming()) {
+            return this.fetchStream(query, params, signal, onProgress);
+        }
+        const response = await fetch(`${this.baseUrl}/api/scrape`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ search_query: query, ...params }),
+            signal
+        });
+        return SearchClient.readPayload(response);
+    }
+
+    async fetchStream(query, params, signal, onProgress) {
+        const search = new URLSearchParams({
+            search_query: query,
+            preference: params.preference,
+            max_results: params.max_results,
+            platforms: (params.platforms || []).join(',')
+        });
+        const response = await fetch(`${this.baseUrl}/api/scrape/stream?${search}`, { signal });
+        if (!response.ok || !response.body) {
+            return SearchClient.readPayload(response);
+        }
+
+        // NDJSON: "platform" lines as each retailer finishes, then one "result" line
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const partial = [];
+        let buffer = '';
+        for (;;) {
+            const { value, done } = await reader.read();
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const event = JSON.parse(line);
+                if (event.type === 'platform') {
+                    partial.push(...event.products);
+                    if (onProgress) onProgress(partial.slice(), event.platform);
+                } else if (event.type === 'error') {
+                    throw new Error(event.error || `Server error: ${event.status}`);
+                } else if (event.type === 'result') {
+                    if (!event.success) throw new Error(event.error || 'Search failed');
+                    return event;
+                }
+            }
+            if (done) throw new Error('Search stream ended without a result');
+        }
+    }
+
+    static async readPayload(response) {
+        let data;
+        try {
+            data = await response.json();
+        } catch (error) {
+            throw new Error(`Server error: ${response.status}`);
+        }
+        if (!response.ok) {
+            throw new Error(data.error || `Server error: ${response.status}`);
+        }
+        if (!data.success) {
+            throw new Error(data.error || 'Search failed');
+        }
+        return data;
+    }
+}
+
 class ShoppingAssistant {
     constructor() {
         this.isSearching = false;
         this.currentPlatform = 'all'; // Default to all platforms
+        this.client = new SearchClient();
         this.init();
     }
 
@@ -48,8 +225,6 @@ class ShoppingAssistant {
     }
 
     async handleSearch() {
-        if (this.isSearching) return;
-
         const searchQuery = document.getElementById('search-input').value.trim();
         
         if (!searchQuery) {
@@ -57,15 +232,16 @@ class ShoppingAssistant {
             return;
         }
 
+        // A new search supersedes the one in progress instead of being ignored
         this.isSearching = true;
         this.showLoading();
         this.hideError();
 
-        // Add user message
-        this.addUserMessage(searchQuery);
-
         try {
             const results = await this.searchProducts(searchQuery);
+
+            // Add user message (only for the search that actually ran)
+            this.addUserMessage(searchQuery);
             
             if (results && results.length > 0) {
                 this.displayProducts(results);
@@ -76,41 +252,28 @@ class ShoppingAssistant {
                 this.addSystemMessage('No products found. Try a different search term.');
             }
         } catch (error) {
+            if (error.name === 'AbortError') return; // replaced by a newer search
+            this.addUserMessage(searchQuery);
             this.showError(`Search failed: ${error.message}`);
             this.addSystemMessage('Sorry, I encountered an error while searching. Please try again.');
-        } finally {
-            this.hideLoading();
-            this.isSearching = false;
         }
+        this.hideLoading();
+        this.isSearching = false;
     }
 
     async searchProducts(searchQuery) {
         const platforms = this.getSelectedPlatforms();
         
-        const response = await fetch('http://localhost:5000/api/scrape', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                search_query: searchQuery,
-                max_results: 12,
-                platforms: platforms,
-                preference: 'neutral'
-            })
+        const data = await this.client.searchDebounced(searchQuery, {
+            max_results: 12,
+            platforms: platforms,
+            preference: 'neutral'
+        }, (products) => {
+            // Streamed searches show each retailer's products as soon as they arrive
+            this.displayProducts(products);
+            this.showProductsDisplay();
         });
 
-        if (!response.ok) {
-            const errorData = await response.json();
-            throw new Error(errorData.error || `Server error: ${response.status}`);
-        }
-
-        const data = await response.json();
-        
-        if (!data.success) {
-            throw new Error(data.error || 'Search failed');
-        }
-
         // Store the full response data for recommendations
         this.lastSearchData = data;
         
@@ -208,9 +371,10 @@ class ShoppingAssistant {
                         <span class="platform-icon">${product.platform_icon || '📦'}</span>
                         <span>${product.platform}</span>
                     </div>
-                    ${product.image ? `<img src="${product.image}" alt="${product.title}" class="product-image" onerror="this.style.display='none'">` : ''}
+                    ${product.image ? this.imageTag(product.image, 240, product.title, 'product-image') : ''}
                     <h4 class="product-title">${this.truncateText(product.title, 60)}</h4>
                     <div class="product-price">₹${product.price}</div>
+                    ${this.renderOtherOffers(product)}
                     <div class="product-rating">
                         ${this.generateStars(product.rating)}
                         <span>(${product.rating})</span>
@@ -227,6 +391,15 @@ class ShoppingAssistant {
         this.filterProductsByPlatform();
     }
 
+    renderOtherOffers(product) {
+        // Merged cross-platform listings carry every offer, cheapest first
+        if (!product.offers || product.offers.length < 2) return '';
+        const others = product.offers.slice(1).map(offer =>
+            `<a href="${offer.url}" target="_blank">${offer.platform_icon || ''} ${offer.platform} ₹${offer.price}</a>`
+        ).join(' · ');
+        return `<div class="product-offers">Also on: ${others}</div>`;
+    }
+
     filterProductsByPlatform() {
         const products = document.querySelectorAll('.product-card');
         products.forEach(product => {
@@ -259,6 +432,18 @@ class ShoppingAssistant {
         return stars;
     }
 
+    thumbnailUrl(imageUrl, width) {
+        // Resized and cached by the backend image proxy instead of hitting retailer CDNs directly
+        return `${this.client.baseUrl}/api/image?url=${encodeURIComponent(imageUrl)}&w=${width}`;
+    }
+
+    imageTag(imageUrl, width, alt, className) {
+        // If the proxy can't serve it (503, host not allowed) try the retailer's URL once before hiding
+        const original = imageUrl.replace(/&/g, '&amp;').replace(/"/g, '&quot;');
+        return `<img src="${this.thumbnailUrl(imageUrl, width)}" data-original="${original}" alt="${alt}" class="${className}" ` +
+            `onerror="if (this.dataset.fallback) { this.style.display='none'; } else { this.dataset.fallback = '1'; this.src = this.dataset.original; }">`;
+    }
+
     truncateText(text, maxLength) {
         return text.length > maxLength ? text.substring(0, maxLength) + '...' : text;
     }
@@ -320,7 +505,7 @@ class ShoppingAssistant {
                 debateHTML += `
                     <div class="recommendation-card">
                         <div class="platform-badge">${product.platform_icon} ${product.platform}</div>
-                        ${product.image ? `<img src="${product.image}" alt="${product.title}" class="recommendation-image" onerror="this.style.display='none'">` : ''}
+                        ${product.image ? this.imageTag(product.image, 240, product.title, 'recommendation-image') : ''}
                         <h4>${this.truncateText(product.title, 50)}</h4>
                         <div class="price-rating">
                             <span class="price">₹${product.price}</span>
@@ -348,7 +533,7 @@ class ShoppingAssistant {
                 debateHTML += `
                     <div class="recommendation-card">
                         <div class="platform-badge">${product.platform_icon} ${product.platform}</div>
-                        ${product.image ? `<img src="${product.image}" alt="${product.title}" class="recommendation-image" onerror="this.style.display='none'">` : ''}
+                        ${product.image ? this.imageTag(product.image, 240, product.title, 'recommendation-image') : ''}
                         <h4>${this.truncateText(product.title, 50)}</h4>
                         <div class="price-rating">
                             <span class="price">₹${product.price}</span>
@@ -372,7 +557,7 @@ class ShoppingAssistant {
                     <h3>🎯 FINAL RECOMMENDATION</h3>
                     <div class="final-product">
                         <div class="platform-badge large">${final_recommendation.platform_icon} ${final_recommendation.platform}</div>
-                        ${final_recommendation.image ? `<img src="${final_recommendation.image}" alt="${final_recommendation.title}" class="final-product-image" onerror="this.style.display='none'">` : ''}
+                        ${final_recommendation.image ? this.imageTag(final_recommendation.image, 480, final_recommendation.title, 'final-product-image') : ''}
                         <h2>${final_recommendation.title}</h2>
                         <div class="final-details">
                             <div class="price">₹${final_recommendation.price}</div>
@@ -0,0 +1,575 @@
+import os
+import time
+import base64
+import atexit
+import threading
+import importlib.util
+from datetime import datetime
+
+from json_provider import encode_json, decode_json
+from http_cache import compute_etag
+from catalog import ProductCatalog
+from refresh_scheduler import QueryPopularity, RefreshCoordinator, RefreshScheduler, MIN_POPULARITY
+from rate_limiter import scrape_priority, PRIORITY_BACKGROUND
+from product_dedup import merge_duplicate_products
+from persona_ranking import PersonaRanking
+from price_history import PriceHistoryStore
+from deadlines import check_deadline, expired
+from query_normalizer import canonical_query, NormalizationStats
+from stages import collect_stages, stage, record_error
+from price_index import PriceIndex, parse_price_range
+
+# The search pipeline shared by every entry point: the Flask app (app.py), the legacy
+# webscraper.py server and the command-line demo (webscraper_fixed.run_enhanced_demo). Scraping,
+# the result caches, the catalog, price history and cross-worker refresh all live here, so a
+# caller gets connection pooling, caching and the platform fan-out by going through search().
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The scraper stack (requests/bs4/lxml) is imported on first use so static and health requests
+# never pay for it; a preloaded master warms it once instead
+WEBSCRAPER_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ('requests', 'bs4', 'lxml'))
+if not WEBSCRAPER_AVAILABLE:
+    print("⚠️ Warning: Scraper dependencies not installed - using mock data for demonstration")
+
+def scraper():
+    """The webscraper_fixed module, imported on first use"""
+    import webscraper_fixed
+    return webscraper_fixed
+
+# Simple cache implementation
+search_cache = {}
+# Ranked product sets per query regardless of preference (see run_search)
+ranked_results = {}
+RANKED_RESULTS_MAX = 500
+# Cache hit ratio, including hits only found because keys use the canonical query
+cache_stats = NormalizationStats()
+CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', 300))  # 5 minutes
+
+# Persistent product catalog (SQLite + FTS) fed by every scrape; CATALOG_PATH= disables it
+CATALOG_PATH = os.environ.get('CATALOG_PATH', os.path.join(BASE_DIR, 'instance', 'catalog.db'))
+try:
+    catalog = ProductCatalog(CATALOG_PATH) if CATALOG_PATH else None
+except Exception as e:
+    catalog = None
+    print(f"⚠️ Warning: Product catalog unavailable: {e}")
+
+# Append-only price/rating time series for every scraped product; PRICE_HISTORY_DIR= disables it
+PRICE_HISTORY_DIR = os.environ.get('PRICE_HISTORY_DIR', os.path.join(BASE_DIR, 'instance', 'price_history'))
+try:
+    price_history = PriceHistoryStore(PRICE_HISTORY_DIR) if PRICE_HISTORY_DIR else None
+except Exception as e:
+    price_history = None
+    print(f"⚠️ Warning: Price history store unavailable: {e}")
+if price_history is not None:
+    atexit.register(price_history.flush)
+
+# Queries currently being refreshed by a background thread
+refreshing_keys = set()
+refresh_lock = threading.Lock()
+
+# Popular queries are re-scraped shortly before they expire; REFRESH_TOP_N=0 disables this
+REFRESH_TOP_N = int(os.environ.get('REFRESH_TOP_N', 20))
+REFRESH_AHEAD = int(os.environ.get('REFRESH_AHEAD', 60))  # seconds before expiry
+REFRESH_INTERVAL = int(os.environ.get('REFRESH_INTERVAL', 30))
+REFRESH_BUDGET_PER_MINUTE = int(os.environ.get('REFRESH_BUDGET_PER_MINUTE', 6))  # per platform
+REFRESH_DB_PATH = os.environ.get('REFRESH_DB_PATH', os.path.join(BASE_DIR, 'instance', 'scheduler.db'))
+# Decayed hit count (10 minute half-life) a query needs before it is refreshed at all
+REFRESH_MIN_SCORE = float(os.environ.get('REFRESH_MIN_SCORE', MIN_POPULARITY))
+
+query_popularity = QueryPopularity(min_score=REFRESH_MIN_SCORE)
+try:
+    # Shared between workers: refresh leases plus every freshly scraped result
+    refresh_coordinator = RefreshCoordinator(REFRESH_DB_PATH) if REFRESH_DB_PATH else None
+except Exception as e:
+    refresh_coordinator = None
+    print(f"⚠️ Warning: Refresh coordination unavailable: {e}")
+
+# Merge the same product listed on several platforms into one entry with per-platform offers
+DEDUP_PRODUCTS = os.environ.get('DEDUP_PRODUCTS', '1') != '0'
+
+# Fetch the next results page in the background right after serving one
+PREFETCH_NEXT_PAGE = os.environ.get('PREFETCH_NEXT_PAGE', '1') != '0'
+
+def make_cache_entry(response_data, cacheable=True):
+    """Build a cache entry; encoded bodies are filled in lazily per payload format"""
+    return {
+        'data': response_data,
+        'timestamp': time.time(),
+        'cacheable': cacheable,
+        'encoded': {}
+    }
+
+def index_product_refs(response_data):
+    """Replace recommendation dicts with their index into `data` to avoid repeating products"""
+    products = response_data.get('data') or []
+    positions = {id(product): i for i, product in enumerate(products)}
+    # Entries decoded from another worker no longer share identity, so fall back to URLs
+    url_positions = {product.get('url'): i for i, product in reversed(list(enumerate(products)))}
+
+    def ref(product):
+        # Products that are not part of `data` stay inline
+        if product is None:
+            return None
+        if id(product) in positions:
+            return positions[id(product)]
+        return url_positions.get(product.get('url'), product)
+
+    payload = dict(response_data)
+    for key in ('premium_recommendations', 'budget_recommendations'):
+        if key in payload:
+            payload[key] = [ref(p) for p in payload[key]]
+    if 'persona_recommendations' in payload:
+        payload['persona_recommendations'] = {
+            persona: [ref(p) for p in recs] for persona, recs in payload['persona_recommendations'].items()
+        }
+    if 'final_recommendation' in payload:
+        payload['final_recommendation'] = ref(payload['final_recommendation'])
+    payload['product_refs'] = 'index'
+    return payload
+
+def encoded_body(entry, product_refs='inline'):
+    """Return (body, etag) for a cache entry, encoding each payload format at most once"""
+    encoded = entry['encoded'].get(product_refs)
+    if encoded is None:
+        payload = entry['data']
+        if product_refs == 'index':
+            payload = index_product_refs(payload)
+        body = encode_json(payload)
+        encoded = (body, compute_etag(body))
+        entry['encoded'][product_refs] = encoded
+    return encoded
+
+def encode_cursor(search_query, preference, max_results, positions, page, price_range=None):
+    """Opaque continuation token holding each platform's next (page, offset)"""
+    state = {'q': search_query, 'pref': preference, 'max': max_results, 'pos': positions, 'page': page}
+    if price_range is not None:
+        state['price'] = list(price_range)
+    return base64.urlsafe_b64encode(encode_json(state)).decode('ascii')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for malformed tokens"""
+    try:
+        state = decode_json(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        positions = {str(platform): (int(pos[0]), int(pos[1])) for platform, pos in state['pos'].items()}
+        price_range = None
+        if state.get('price'):
+            price_range = tuple(None if bound is None else float(bound) for bound in state['price'])
+        return (str(state['q']), str(state['pref']), int(state['max']), positions, int(state['page']),
+                price_range)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def normalize_search_params(params):
+    """Read search parameters from a JSON body or query string into a canonical form"""
+    search = {
+        'search_query': ' '.join(str(params.get('search_query') or '').split()),
+        'preference': params.get('preference', 'neutral'),
+        'platforms': params.get('platforms', ['amazon', 'flipkart', 'myntra']),
+        # 'index' makes recommendations reference products in `data` by position
+        'product_refs': 'index' if params.get('product_refs') == 'index' else 'inline',
+        # 'local-first' answers from the product catalog and refreshes in the background
+        'mode': 'local-first' if params.get('mode') == 'local-first' else 'live',
+        'positions': None,
+        'page': 1,
+        # min_price/max_price or a question-flow budget_range (raises ValueError when malformed)
+        'price_range': parse_price_range(params)
+    }
+    try:
+        search['max_results'] = int(params.get('max_results', 12))
+    except (TypeError, ValueError):
+        search['max_results'] = 12
+    if isinstance(search['platforms'], str):
+        search['platforms'] = [p.strip() for p in search['platforms'].split(',') if p.strip()]
+
+    # A cursor from a previous response continues that search on its next page
+    if params.get('cursor'):
+        (search['search_query'], search['preference'], search['max_results'],
+         search['positions'], search['page'], search['price_range']) = decode_cursor(params['cursor'])
+    return search
+
+def search_for_mode(search):
+    """Dispatch a search to the live or local-first path"""
+    args = (search['search_query'], search['max_results'], search['preference'], search['platforms'])
+    price_range = search['price_range']
+    if search['positions'] is None:
+        # Popularity (and so background refresh) tracks the unfiltered product set
+        query_popularity.record(make_cache_key(search['search_query'], search['preference'], search['max_results']), args)
+        if search['mode'] == 'local-first':
+            return run_local_first_search(*args, price_range=price_range)
+
+    entry = run_search(*args, positions=search['positions'], page=search['page'], price_range=price_range)
+
+    next_cursor = entry['data'].get('next_cursor')
+    if PREFETCH_NEXT_PAGE and next_cursor:
+        query, preference, max_results, positions, page, price_range = decode_cursor(next_cursor)
+        if remaining_ttl(make_cache_key(query, preference, max_results, positions, price_range)) == 0:
+            refresh_in_background(query, max_results, preference, search['platforms'],
+                                  positions=positions, page=page, force=False, price_range=price_range)
+    return entry
+
+def make_cache_key(search_query, preference, max_results, positions=None, price_range=None):
+    """Key shared by search_cache, refresh leases and the shared result store
+
+    The query is canonicalized (see query_normalizer), so "Laptops " and "laptop" share a key;
+    later pages include their positions and price-filtered responses their price range.
+    """
+    key = f"{canonical_query(search_query)}_{preference}_{max_results}"
+    if positions:
+        key += '_' + ','.join(f"{platform}:{pos[0]}.{pos[1]}" for platform, pos in sorted(positions.items()))
+    if price_range is not None:
+        key += '_price:' + '-'.join('' if bound is None else f'{bound:g}' for bound in price_range)
+    return key
+
+def remaining_ttl(cache_key):
+    """Seconds until a search_cache entry expires (0 when missing)"""
+    entry = search_cache.get(cache_key)
+    if not entry:
+        return 0
+    return max(CACHE_TIMEOUT - (time.time() - entry['timestamp']), 0)
+
+def adopt_shared_result(cache_key, max_age=None):
+    """Load a result another worker scraped recently into this worker's cache"""
+    if refresh_coordinator is None:
+        return None
+    try:
+        shared = refresh_coordinator.fetch(cache_key, max_age or CACHE_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️ Shared result lookup failed: {e}")
+        return None
+    if shared is None:
+        return None
+    body, created_at = shared
+    entry = make_cache_entry(decode_json(body))
+    entry['timestamp'] = created_at
+    entry['encoded']['inline'] = (body, compute_etag(body))
+    search_cache[cache_key] = entry
+    return entry
+
+def run_search(search_query, max_results, preference, platforms, force=False, positions=None, page=1,
+               price_range=None):
+    """Return the cache entry for a search, scraping all platforms on a cache miss (or when forced)
+
+    positions/page select a later results page (see encode_cursor); None means the first page.
+    price_range (min_price, max_price) narrows the scraped products to a price band, cheapest first.
+    """
+    cache_key = make_cache_key(search_query, preference, max_results, positions, price_range)
+    if not force:
+        # Check cache first, then results other workers already scraped
+        entry = search_cache.get(cache_key)
+        if entry and time.time() - entry['timestamp'] < CACHE_TIMEOUT:
+            print(f"📦 Serving from cache: {search_query}")
+            cache_stats.record(True, search_query, entry.get('query'))
+            return entry
+        entry = adopt_shared_result(cache_key)
+        if entry is not None:
+            print(f"📦 Serving from shared cache: {search_query}")
+            cache_stats.record(True, search_query)
+            return entry
+
+    if not WEBSCRAPER_AVAILABLE:
+        # Fallback to enhanced mock data (never cached)
+        mock_data = generate_enhanced_mock_data(search_query, max_results, platforms)
+        if price_range is not None:
+            mock_data = PriceIndex(mock_data).within(*price_range)
+        if mock_data:
+            response_data = {
+                'success': True,
+                'data': mock_data,
+                'premium_recommendations': mock_data[:4],
+                'budget_recommendations': mock_data[-4:],
+                'final_recommendation': mock_data[0],
+                'preference': preference,
+                'timestamp': datetime.now().isoformat()
+            }
+        else:
+            # Nothing in the price range: the same shape as an empty scrape
+            response_data = build_search_response(mock_data, preference, platforms)
+        response_data['source'] = 'mock_data'
+        response_data['note'] = 'webscraper.py not available - using enhanced mock data'
+        if price_range is not None:
+            response_data['price_range'] = {'min_price': price_range[0], 'max_price': price_range[1]}
+            response_data['total_in_range'] = len(mock_data)
+        return make_cache_entry(response_data, cacheable=False)
+
+    # Same products under another preference: re-rank the kept shortlists instead of scraping again
+    ranked_key = make_cache_key(search_query, '*', max_results, positions)
+    ranked = ranked_results.get(ranked_key)
+    partial = False
+    failed = False
+    if not force and ranked and time.time() - ranked['timestamp'] < CACHE_TIMEOUT:
+        print(f"🔀 Re-ranking for preference '{preference}': {search_query}")
+        cache_stats.record(True, search_query, ranked['query'])
+        results, next_positions = ranked['results'], ranked['next_positions']
+        scraped_count, ranking = ranked['scraped_count'], ranked['ranking']
+        scrape_stages = ranked['stages']
+        price_index = ranked['price_index']
+    else:
+        if not force:
+            cache_stats.record(False)
+        # Shed load instead of queueing behind a full fetch queue (see fallback_response)
+        webscraper = scraper()
+        webscraper.AUTOTUNER.admit()
+        check_deadline('scraping')
+
+        # Every fetch, parse and post-processing step is a stage (see stages): a failing stage is
+        # reported in the response while everything that succeeded is still returned and cached
+        with collect_stages() as stage_log:
+            # Use the enhanced multi-platform scraper (platforms fail independently)
+            with stage('scrape'):
+                results, next_positions = webscraper.scrape_all_platforms_paged(search_query, max_results, positions)
+
+            if catalog is not None and results:
+                with stage('catalog', isolate=True):
+                    catalog.upsert_products(results)
+
+            if price_history is not None and results:
+                with stage('price_history', isolate=True):
+                    price_history.record(results)
+
+            # Past the deadline the scrape returned whatever it had; skip optional work and answer now
+            partial = expired()
+
+            scraped_count = len(results)
+            if DEDUP_PRODUCTS and not partial:
+                with stage('dedup', isolate=True):
+                    results = merge_duplicate_products(results)
+
+            ranking = None
+            with stage('ranking', isolate=True):
+                ranking = PersonaRanking(results)
+        scrape_stages = stage_log.report()
+        # Nothing scraped and something failed (outage, 403): an error, not an empty result
+        failed = scraped_count == 0 and any('error' in entry for entry in scrape_stages)
+        # Sorted once per product set; each budget-filtered request then bisects it
+        price_index = PriceIndex(results)
+        if ranking is not None and not partial and not failed:
+            ranked_results[ranked_key] = {
+                'timestamp': time.time(),
+                'query': search_query,
+                'results': results,
+                'next_positions': next_positions,
+                'scraped_count': scraped_count,
+                'ranking': ranking,
+                'price_index': price_index,
+                'stages': scrape_stages
+            }
+            if len(ranked_results) > RANKED_RESULTS_MAX:
+                for stale in [k for k, v in list(ranked_results.items()) if time.time() - v['timestamp'] >= CACHE_TIMEOUT]:
+                    ranked_results.pop(stale, None)
+
+    duplicates_merged = scraped_count - len(results)
+    # Persona stages run per preference; re-ranked responses report the original scrape's stages
+    with collect_stages() as stage_log:
+        if price_range is not None:
+            with stage('price_filter'):
+                results = price_index.within(*price_range)
+                if ranking is not None:
+                    ranking = PersonaRanking(results)
+        response_data = build_search_response(results, preference, platforms, ranking=ranking)
+    response_data['stages'] = scrape_stages + stage_log.report()
+    errors = [entry for entry in response_data['stages'] if 'error' in entry]
+    if errors:
+        response_data['errors'] = errors
+    if scraped_count:
+        response_data['duplicates_merged'] = duplicates_merged
+    if price_range is not None:
+        response_data['price_range'] = {'min_price': price_range[0], 'max_price': price_range[1]}
+        response_data['total_in_range'] = len(results)
+    response_data['page'] = page
+    response_data['next_cursor'] = (encode_cursor(search_query, preference, max_results, next_positions, page + 1,
+                                                  price_range)
+                                    if next_positions else None)
+    if partial:
+        response_data['partial'] = True
+        print(f"⏱️ Deadline reached - returning {len(results)} partial results: {search_query}")
+        return make_cache_entry(response_data, cacheable=False)
+    if failed:
+        # Not cached or shared, so the next request retries the retailers
+        print(f"⚠️ Every platform failed - not caching: {search_query}")
+        return make_cache_entry(response_data, cacheable=False)
+
+    # Cache the results (the encoded body is reused by later cache hits)
+    entry = make_cache_entry(response_data)
+    entry['query'] = search_query  # the wording that was scraped, for cache_stats
+    search_cache[cache_key] = entry
+    if refresh_coordinator is not None:
+        try:
+            refresh_coordinator.publish(cache_key, encoded_body(entry)[0], entry['timestamp'])
+        except Exception as e:
+            print(f"⚠️ Could not share result with other workers: {e}")
+    return entry
+
+def build_search_response(results, preference, platforms, source='Multi-Platform (Amazon, Flipkart, Myntra)',
+                          ranking=None):
+    """Run the personas over a product list and build the /api/scrape payload
+
+    Pass the PersonaRanking of `results` when one exists; switching preference then costs O(k).
+    """
+    if not results:
+        return {
+            'success': True,
+            'data': [],
+            'message': 'No products found for your search across all platforms',
+            'timestamp': datetime.now().isoformat(),
+            'platforms_searched': platforms
+        }
+
+    # Get persona recommendations; each persona is its own stage, so one failing persona only
+    # empties its own recommendations
+    if ranking is None:
+        with stage('ranking', isolate=True):
+            ranking = PersonaRanking(results)
+    pm_recs, bb_recs, persona_recs, final_rec = [], [], {}, None
+    if ranking is not None:
+        for persona, error in ranking.errors.items():
+            record_error('scoring', error, persona=persona)
+        with stage('persona', isolate=True, persona='premium'):
+            pm_recs = ranking.top('premium', 4)
+        with stage('persona', isolate=True, persona='budget'):
+            bb_recs = ranking.top('budget', 4)
+        # Shortlists of any further declared personas (PERSONAS_FILE)
+        for persona in ranking.personas.names:
+            if persona not in ('premium', 'budget', 'value'):
+                with stage('persona', isolate=True, persona=persona):
+                    persona_recs[persona] = ranking.top(persona, 4)
+
+        # Get final recommendation based on preference
+        debated = False
+        with stage('debate', isolate=True):
+            final_rec = scraper().persona_debate(results, preference, ranking)
+            debated = True
+        if not debated:
+            # The debate only adds console output; the pick itself comes from the ranking
+            with stage('final', isolate=True):
+                final_rec = ranking.final(preference)
+
+    # Prepare platform statistics
+    platform_stats = {}
+    for product in results:
+        platform = product.get('platform', 'Unknown')
+        platform_stats[platform] = platform_stats.get(platform, 0) + 1
+
+    return {
+        'success': True,
+        'data': results,
+        'premium_recommendations': pm_recs,
+        'budget_recommendations': bb_recs,
+        'persona_recommendations': persona_recs,
+        'final_recommendation': final_rec,
+        'preference': preference,
+        'timestamp': datetime.now().isoformat(),
+        'platform_stats': platform_stats,
+        'total_results': len(results),
+        'source': source
+    }
+
+def refresh_in_background(search_query, max_results, preference, platforms, positions=None, page=1, force=True,
+                          price_range=None):
+    """Re-scrape (or with force=False, prefetch) a query on a daemon thread unless one is already running"""
+    cache_key = make_cache_key(search_query, preference, max_results, positions, price_range)
+    with refresh_lock:
+        if cache_key in refreshing_keys:
+            return False
+        refreshing_keys.add(cache_key)
+
+    def refresh():
+        try:
+            with scrape_priority(PRIORITY_BACKGROUND):
+                run_search(search_query, max_results, preference, platforms, force=force,
+                           positions=positions, page=page, price_range=price_range)
+        except Exception as e:
+            print(f"⚠️ Background refresh failed for '{search_query}': {e}")
+        finally:
+            with refresh_lock:
+                refreshing_keys.discard(cache_key)
+
+    threading.Thread(target=refresh, daemon=True).start()
+    return True
+
+def run_local_first_search(search_query, max_results, preference, platforms, price_range=None):
+    """Answer from the local catalog when it has matches and refresh from the retailers in the background"""
+    cache_key = make_cache_key(search_query, preference, max_results, price_range=price_range)
+    entry = search_cache.get(cache_key)
+    if entry and time.time() - entry['timestamp'] < CACHE_TIMEOUT:
+        cache_stats.record(True, search_query, entry.get('query'))
+        return entry
+    if catalog is None or not WEBSCRAPER_AVAILABLE:
+        return run_search(search_query, max_results, preference, platforms, price_range=price_range)
+
+    products = catalog.search(search_query, max_results)
+    if products and price_range is not None:
+        products = PriceIndex(products).within(*price_range)
+    if not products:
+        return run_search(search_query, max_results, preference, platforms, price_range=price_range)
+
+    print(f"🗂️ Serving from local catalog: {search_query} ({len(products)} products)")
+    # The refresh scrapes the whole product set; the price band is applied when it is served
+    refresh_in_background(search_query, max_results, preference, platforms)
+    response_data = build_search_response(products, preference, platforms, source='Local catalog')
+    response_data['mode'] = 'local-first'
+    if price_range is not None:
+        response_data['price_range'] = {'min_price': price_range[0], 'max_price': price_range[1]}
+    # The live refresh replaces this answer in search_cache, so it is not cached itself
+    return make_cache_entry(response_data, cacheable=False)
+
+def scheduled_refresh(params):
+    """Refresh callback for the scheduler: re-scrape and replace the cache entry"""
+    search_query, max_results, preference, platforms = params
+    print(f"🔄 Scheduled refresh: {search_query}")
+    # Background refreshes queue behind user-facing scrapes for the same retailer
+    with scrape_priority(PRIORITY_BACKGROUND):
+        run_search(search_query, max_results, preference, platforms, force=True)
+
+refresh_scheduler = None
+if WEBSCRAPER_AVAILABLE and REFRESH_TOP_N > 0 and refresh_coordinator is not None:
+    refresh_scheduler = RefreshScheduler(
+        query_popularity, refresh_coordinator, scheduled_refresh, remaining_ttl,
+        platforms_fn=lambda params: scraper().platforms_for_query(params[0]),
+        cache_timeout=CACHE_TIMEOUT, top_n=REFRESH_TOP_N, refresh_ahead=REFRESH_AHEAD,
+        interval=REFRESH_INTERVAL, budget_per_minute=REFRESH_BUDGET_PER_MINUTE
+    )
+
+def generate_enhanced_mock_data(search_query, max_results, platforms):
+    """Generate enhanced mock product data with multiple platforms"""
+    products = []
+    platforms_info = {
+        'amazon': {'icon': '📦', 'base_price': 1000},
+        'flipkart': {'icon': '🛒', 'base_price': 800},
+        'myntra': {'icon': '👕', 'base_price': 1200}
+    }
+    
+    for i in range(max_results):
+        platform = list(platforms_info.keys())[i % len(platforms_info)]
+        platform_data = platforms_info[platform]
+        
+        price = platform_data['base_price'] + (i * 300)
+        rating = max(3.0, min(5.0, 4.0 + (i * 0.1)))
+        
+        product = {
+            'title': f'{search_query.capitalize()} {platform.capitalize()} Edition {i+1}',
+            'price': price,
+            'rating': round(rating, 1),
+            'url': f'https://www.{platform}.com/search?q={search_query.replace(" ", "+")}',
+            'image': f'https://picsum.photos/300/400?random={i+100}',
+            'platform': platform.capitalize(),
+            'platform_icon': platform_data['icon']
+        }
+        products.append(product)
+    
+    return products
+
+def search(params):
+    """The /api/scrape payload for raw search parameters (see normalize_search_params)
+
+    Entry point for callers outside a Flask request. Raises ValueError for bad parameters and
+    lets Overloaded / DeadlineExceeded propagate like run_search does.
+    """
+    normalized = normalize_search_params(params)
+    if not normalized['search_query']:
+        raise ValueError('Search query cannot be empty')
+    return search_for_mode(normalized)['data']
+
+def start_services():
+    """Start this process's background refresh (threads do not survive gunicorn's fork)"""
+    if refresh_scheduler is not None:
+        refresh_scheduler.start()
@@ -0,0 +1,80 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from deadlines import DeadlineExceeded
+from autotune import Overloaded
+
+# Timings and failures of the stages of the current search (fetch, parse, rank, ...); fan-out
+# threads run in a copy of the request context and append to the same log
+current_stages = contextvars.ContextVar('current_stages', default=None)
+
+# Control flow, never swallowed by an isolated stage
+NOT_ISOLATED = (DeadlineExceeded, Overloaded)
+
+
+class StageLog:
+    """Per-stage timings and errors of one search"""
+
+    def __init__(self):
+        self.entries = []
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, error=None, **info):
+        entry = {'stage': name, **info, 'ms': round(seconds * 1000, 1)}
+        if isinstance(error, BaseException):
+            entry['error'] = f'{type(error).__name__}: {error}'
+        elif error is not None:
+            entry['error'] = str(error)
+        with self.lock:
+            self.entries.append(entry)
+
+    def report(self):
+        with self.lock:
+            return list(self.entries)
+
+
+@contextmanager
+def collect_stages():
+    """Give the block a fresh StageLog (yielded)"""
+    log = StageLog()
+    token = current_stages.set(log)
+    try:
+        yield log
+    finally:
+        current_stages.reset(token)
+
+
+@contextmanager
+def stage(name, isolate=False, **info):
+    """Time the block as stage `name` in the current StageLog
+
+    Exceptions are recorded against the stage; with isolate=True they are also swallowed so the
+    caller carries on with whatever the stage left behind (deadlines and load shedding still
+    propagate). Without a StageLog the block runs untimed.
+    """
+    log = current_stages.get()
+    started = time.perf_counter()
+    try:
+        yield
+    except NOT_ISOLATED as e:
+        if log is not None:
+            log.record(name, time.perf_counter() - started, e, **info)
+        raise
+    except Exception as e:
+        if log is not None:
+            log.record(name, time.perf_counter() - started, e, **info)
+        if not isolate:
+            raise
+        print(f"⚠️ Stage {name} failed: {type(e).__name__}: {e}")
+    else:
+        if log is not None:
+            log.record(name, time.perf_counter() - started, **info)
+
+
+def record_error(name, error, **info):
+    """Record a failure (exception or message) that was handled outside a stage block"""
+    log = current_stages.get()
+    if log is not None:
+        log.record(name, 0.0, error, **info)
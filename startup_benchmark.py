@@ -0,0 +1,56 @@
+"""
+Measure worker startup cost: app import time and the first static/API requests.
+Each run happens in a fresh interpreter so module caches do not skew the numbers.
+
+    python startup_benchmark.py [runs]
+"""
+import os
+import sys
+import json
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+PROBE = """
+import time, json, sys
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.get('/')
+first_static = time.perf_counter()
+client.get('/api/health')
+first_health = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_static_ms': (first_static - imported) * 1000,
+    'first_health_ms': (first_health - first_static) * 1000,
+    'scraper_loaded': 'webscraper_fixed' in sys.modules,
+    'modules': len(sys.modules)
+}))
+"""
+
+
+def run_probe(preload):
+    env = dict(os.environ, REFRESH_TOP_N='0', PYTHONDONTWRITEBYTECODE='1')
+    env.pop('GUNICORN_PRELOAD', None)
+    if preload:
+        env['GUNICORN_PRELOAD'] = '1'
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for label, preload in (('lazy (per worker)', False), ('preloaded master', True)):
+        samples = [run_probe(preload) for _ in range(runs)]
+        print(f"⏱️ {label}:")
+        for key in ('import_ms', 'first_static_ms', 'first_health_ms'):
+            print(f"   {key:16} median {statistics.median(s[key] for s in samples):8.1f}")
+        print(f"   scraper loaded at first request: {samples[0]['scraper_loaded']}, modules: {samples[0]['modules']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import io
+import os
+import struct
+import sys
+import types
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import image_proxy
+from image_proxy import ImageProxyError, ThumbnailCache, fetch_remote_image
+
+SOURCE_URL = 'https://m.media-amazon.com/images/I/fixture.png'
+
+
+def fixture_png(width=600, height=300):
+    """Solid grey RGB PNG, built by hand so the fixture needs no image library"""
+    def chunk(kind, payload):
+        return (struct.pack('>I', len(payload)) + kind + payload
+                + struct.pack('>I', zlib.crc32(kind + payload) & 0xffffffff))
+    rows = b''.join(b'\x00' + b'\x80' * (width * 3) for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows))
+            + chunk(b'IEND', b''))
+
+
+class FixtureFetcher:
+    """Stands in for fetch_remote_image and counts calls"""
+
+    def __init__(self, data):
+        self.data = data
+        self.calls = []
+
+    def __call__(self, url, check_url=None):
+        self.calls.append(url)
+        return self.data
+
+
+@pytest.fixture
+def cache(tmp_path):
+    fetcher = FixtureFetcher(fixture_png())
+    return ThumbnailCache(str(tmp_path), max_bytes=10 * 1024 * 1024, fetcher=fetcher), fetcher
+
+
+@pytest.mark.skipif(not image_proxy.PIL_AVAILABLE, reason='Pillow not installed')
+def test_resizes_to_requested_width(cache):
+    from PIL import Image
+    thumbnails, _ = cache
+    data, mimetype, _ = thumbnails.get(SOURCE_URL, 240)
+    assert mimetype == 'image/jpeg'
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.size == (240, 120)
+
+
+@pytest.mark.skipif(image_proxy.PIL_AVAILABLE, reason='Pillow installed')
+def test_passes_original_through_without_pillow(cache):
+    thumbnails, fetcher = cache
+    data, mimetype, _ = thumbnails.get(SOURCE_URL, 240)
+    assert data == fetcher.data
+    assert mimetype == 'image/png'
+
+
+def test_second_request_is_a_cache_hit(cache):
+    thumbnails, fetcher = cache
+    first = thumbnails.get(SOURCE_URL, 240)
+    second = thumbnails.get(SOURCE_URL, 240)
+    assert first == second
+    assert fetcher.calls == [SOURCE_URL]
+    assert (thumbnails.hits, thumbnails.misses) == (1, 1)
+    # Another width is a separate entry
+    thumbnails.get(SOURCE_URL, 120)
+    assert len(fetcher.calls) == 2
+
+
+def test_rejects_disallowed_host_and_width(cache):
+    thumbnails, fetcher = cache
+    with pytest.raises(ImageProxyError):
+        thumbnails.get('https://evil.example/x.png', 240)
+    with pytest.raises(ImageProxyError):
+        thumbnails.get(SOURCE_URL, 300)
+    assert fetcher.calls == []
+
+
+class FakeRaw(io.BytesIO):
+    def read(self, size=-1, decode_content=False):
+        return super().read(size)
+
+
+class FakeResponse:
+    def __init__(self, status, location=None, body=b''):
+        self.status_code = status
+        self.headers = {'Location': location} if location else {}
+        self.is_redirect = location is not None
+        self.raw = FakeRaw(body)
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+
+def fake_requests(monkeypatch, responses):
+    requested = []
+
+    def get(url, **kwargs):
+        assert kwargs['allow_redirects'] is False
+        requested.append(url)
+        return responses[url]
+
+    monkeypatch.setitem(sys.modules, 'requests', types.SimpleNamespace(get=get))
+    return requested
+
+
+def test_redirect_to_disallowed_host_is_refused(tmp_path, monkeypatch):
+    requested = fake_requests(monkeypatch, {
+        SOURCE_URL: FakeResponse(302, location='https://evil.example/internal.png'),
+    })
+    thumbnails = ThumbnailCache(str(tmp_path), max_bytes=1024 * 1024, fetcher=fetch_remote_image)
+    with pytest.raises(ImageProxyError):
+        thumbnails.get(SOURCE_URL, 240)
+    # The disallowed target is never requested and nothing is cached
+    assert requested == [SOURCE_URL]
+    assert os.listdir(tmp_path) == []
+
+
+def test_redirect_within_allowlist_is_followed(tmp_path, monkeypatch):
+    image = fixture_png(100, 50)
+    target = 'https://images-eu.ssl-images-amazon.com/images/I/fixture.png'
+    requested = fake_requests(monkeypatch, {
+        SOURCE_URL: FakeResponse(301, location=target),
+        target: FakeResponse(200, body=image),
+    })
+    thumbnails = ThumbnailCache(str(tmp_path), max_bytes=1024 * 1024, fetcher=fetch_remote_image)
+    data, _, _ = thumbnails.get(SOURCE_URL, 120)
+    assert requested == [SOURCE_URL, target]
+    assert data
@@ -1,6 +1,23 @@
+import os
+import re
+import time
+import threading
+import contextvars
 import requests
+import soupsieve
 from bs4 import BeautifulSoup
-from urllib.parse import quote_plus
+from requests.adapters import HTTPAdapter
+from urllib.parse import quote_plus, urlsplit
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from rate_limiter import HostRateLimiter, PRIORITY_BACKGROUND, current_priority
+from autotune import AdaptiveConcurrency, LoadBoard
+from persona_ranking import PersonaRanking
+from page_archive import PageArchive
+from parse_pool import ParsePool
+from deadlines import DeadlineExceeded, check_deadline, clamp_timeout, expired
+from request_profiler import profiled
+from stages import stage, record_error
 
 # ---- User-Agent and Headers for Indian Sites ----
 HEADERS = {
@@ -13,242 +30,586 @@ HEADERS = {
     "Connection": "keep-alive"
 }
 
+# ---- Compiled CSS Selectors ----
+# Compiled once at import (in the gunicorn master when the app is preloaded).
+# Tuples are fallbacks tried in order - retailers frequently change their markup.
+def compile_selectors(selectors):
+    """Compile a {name: selector or (fallback, ...)} mapping with soupsieve"""
+    return {
+        name: tuple(soupsieve.compile(s) for s in value) if isinstance(value, tuple) else soupsieve.compile(value)
+        for name, value in selectors.items()
+    }
+
+AMAZON_SELECTORS = compile_selectors({
+    'items': "div.s-main-slot div[data-component-type='s-search-result']",
+    'title': ("h2 a span", "span.a-size-base-plus", "span.a-text-normal", "h2 span"),
+    'link': ("h2 a", "a.a-link-normal", "a.a-text-normal"),
+    'price_whole': "span.a-price-whole",
+    'price_fraction': "span.a-price-fraction",
+    'rating': "span.a-icon-alt",
+    'reviews': "span.a-size-base.s-underline-text",
+    'image': "img.s-image"
+})
+
+FLIPKART_SELECTORS = compile_selectors({
+    'items': "div._1AtVbE",
+    'link': ("a.IRpwTa", "a._1fQZEK"),
+    'price': "div._30jeq3",
+    'rating': "div._3LWZlK",
+    'reviews': "span._2_R_DZ",
+    'image': ("img._396cs4", "img._2r_T1I")
+})
+
+MYNTRA_SELECTORS = compile_selectors({
+    'items': "li.product-base",
+    'brand': "h3.product-brand",
+    'name': "h4.product-product",
+    'link': "a[href]",
+    'price': "span.product-discountedPrice, span.product-price",
+    'rating': "div.product-ratingsContainer",
+    'reviews': "div.product-ratingsCount",
+    'image': "img.img-responsive"
+})
+
+COUNT_PATTERN = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*([kKmM]?)')
+
+def parse_count(elem):
+    """Count from review text such as 1,234 / (1.2k) / 3,210 Ratings & 250 Reviews"""
+    match = COUNT_PATTERN.search(elem.text) if elem else None
+    if not match:
+        return 0
+    value = float(match.group(1).replace(',', ''))
+    return int(value * {'k': 1000, 'm': 1000000}.get(match.group(2).lower(), 1))
+
+def first_match(item, selectors):
+    """First element matched by a tuple of fallback selectors"""
+    for selector in selectors:
+        elem = selector.select_one(item)
+        if elem is not None:
+            return elem
+    return None
+
+# ---- HTTP Sessions ----
+# One pooled keep-alive session per thread; created lazily so no socket is shared across fork
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 8))
+_sessions = threading.local()
+
+def get_session():
+    """Keep-alive requests session for the current thread and process"""
+    session = getattr(_sessions, 'session', None)
+    if session is None or getattr(_sessions, 'pid', None) != os.getpid():
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _sessions.session = session
+        _sessions.pid = os.getpid()
+    return session
+
+# ---- Outbound Rate Limiting ----
+# Token bucket per retailer host; RATE_LIMIT_DB shares the budget across gunicorn workers
+RATE_LIMITER = HostRateLimiter(
+    requests_per_minute=int(os.environ.get('RATE_LIMIT_PER_MINUTE', 20)),
+    burst=int(os.environ.get('RATE_LIMIT_BURST', 5)),
+    shared_path=os.environ.get('RATE_LIMIT_DB') or None
+)
+# Longest a scrape may queue for its host before the platform is skipped
+RATE_LIMIT_MAX_WAIT = float(os.environ.get('RATE_LIMIT_MAX_WAIT', 15))
+RATE_LIMIT_MAX_WAIT_BACKGROUND = float(os.environ.get('RATE_LIMIT_MAX_WAIT_BACKGROUND', 120))
+
+# ---- Adaptive Concurrency ----
+# Caps concurrent retailer fetches per worker and sizes per-platform timeouts from observed latency
+AUTOTUNE_DB = os.environ.get('AUTOTUNE_DB')  # set by gunicorn.conf.py when worker autoscaling is on
+AUTOTUNER = AdaptiveConcurrency(
+    min_limit=int(os.environ.get('SCRAPE_MIN_CONCURRENCY', 2)),
+    max_limit=int(os.environ.get('SCRAPE_MAX_CONCURRENCY', 16)),
+    max_queue=int(os.environ.get('SCRAPE_MAX_QUEUE', 8)),
+    load_board=LoadBoard(AUTOTUNE_DB) if AUTOTUNE_DB else None
+)
+
+PLATFORM_HOSTS = {
+    'www.amazon.in': 'amazon',
+    'www.flipkart.com': 'flipkart',
+    'www.myntra.com': 'myntra'
+}
+
+def fetch_page(url):
+    """GET a retailer page once the per-host rate limiter and the concurrency limit grant a slot
+
+    Every wait and the socket timeout are capped by the request deadline (see deadlines.py).
+    """
+    host = urlsplit(url).hostname
+    platform = PLATFORM_HOSTS.get(host, host)
+    background = current_priority.get() >= PRIORITY_BACKGROUND
+    max_wait = RATE_LIMIT_MAX_WAIT_BACKGROUND if background else RATE_LIMIT_MAX_WAIT
+    check_deadline(f"fetching {platform}")
+    RATE_LIMITER.acquire(host, timeout=clamp_timeout(max_wait))
+    AUTOTUNER.acquire(timeout=clamp_timeout(max_wait))
+    timeout = AUTOTUNER.timeout_for(platform)
+    cut_short = clamp_timeout(timeout) < timeout
+    started = time.monotonic()
+    ok = False
+    try:
+        check_deadline(f"fetching {platform}")
+        response = get_session().get(url, timeout=max(clamp_timeout(timeout), 0.1))
+        ok = True
+        return response
+    except requests.RequestException as e:
+        if cut_short and expired():
+            raise DeadlineExceeded(f"Request deadline passed while fetching {platform}") from e
+        raise
+    finally:
+        AUTOTUNER.release(platform, time.monotonic() - started, ok, cancelled=cut_short and not ok)
+
+# ---- Raw Page Archive ----
+# Optional compressed archive of fetched result pages for replay_archive.py (PAGE_ARCHIVE_DIR unset = off)
+PAGE_ARCHIVE_DIR = os.environ.get('PAGE_ARCHIVE_DIR')
+PAGE_ARCHIVE = (PageArchive(PAGE_ARCHIVE_DIR, int(os.environ.get('PAGE_ARCHIVE_MAX_BYTES', 500 * 1024 * 1024)))
+                if PAGE_ARCHIVE_DIR else None)
+
+def archive_page(platform, search_query, page, url, content, products):
+    """Keep the raw page so parser fixes can be replayed without re-scraping"""
+    if PAGE_ARCHIVE is None:
+        return
+    try:
+        PAGE_ARCHIVE.store(platform, search_query, page, url, content, products)
+    except Exception as e:
+        print(f"⚠️ Page archive write failed: {e}")
+
+# ---- Parse Offloading ----
+# PARSE_POOL_SIZE > 0 parses pages of at least PARSE_POOL_MIN_BYTES in that many processes
+PARSE_POOL = ParsePool(
+    size=int(os.environ.get('PARSE_POOL_SIZE', 0)),
+    parsers_module='webscraper_fixed',
+    min_bytes=int(os.environ.get('PARSE_POOL_MIN_BYTES', 256 * 1024))
+)
+
+def parse_page(platform, content, max_results):
+    """Extract products from a fetched page, offloading large pages to the parse pool"""
+    return PARSE_POOL.parse(platform, content, max_results, PLATFORM_PARSERS[platform])
+
+# ---- Multi-Platform Parsers ----
+
+def parse_amazon_in(content, max_results=10):
+    """Extract products from an Amazon India search results page"""
+    soup = BeautifulSoup(content, "lxml")
+    
+    products = []
+    items = AMAZON_SELECTORS['items'].select(soup)[:max_results]
+    
+    for item in items:
+        try:
+            title_elem = first_match(item, AMAZON_SELECTORS['title'])
+            title = title_elem.text.strip() if title_elem else "N/A"
+            
+            link_elem = first_match(item, AMAZON_SELECTORS['link'])
+            link = "https://www.amazon.in" + link_elem["href"] if link_elem and link_elem.get("href") else "N/A"
+            
+            # Debug: print the HTML structure to understand what's available
+            if title == "N/A":
+                print(f"DEBUG - Item HTML: {item.prettify()[:500]}...")
+            
+            # Extract price
+            price_whole = AMAZON_SELECTORS['price_whole'].select_one(item)
+            price_fraction = AMAZON_SELECTORS['price_fraction'].select_one(item)
+            price = 0
+            if price_whole:
+                try:
+                    price_str = price_whole.text.replace(",", "").replace("₹", "").strip()
+                    if price_fraction:
+                        price_str += "." + price_fraction.text
+                    price = float(price_str)
+                except:
+                    price = 0
+            
+            # Extract rating
+            rating_span = AMAZON_SELECTORS['rating'].select_one(item)
+            rating = 0
+            if rating_span:
+                try:
+                    rating = float(rating_span.text.split()[0])
+                except:
+                    rating = 0
+            
+            # Extract image
+            img_elem = AMAZON_SELECTORS['image'].select_one(item)
+            image_url = (
+                img_elem.get("src")
+                or img_elem.get("data-src")
+                or img_elem.get("srcset", "").split(" ")[0]
+                if img_elem else ""
+            )
+            
+            print(f"Amazon - Title: {title}, Link: {link}, Price: {price}, Rating: {rating}, Image: {image_url}")  # Debug statement
+            
+            products.append({
+                "title": title,
+                "price": price,
+                "rating": rating,
+                "url": link,
+                "image": image_url,
+                "reviews": parse_count(AMAZON_SELECTORS['reviews'].select_one(item)),
+                "platform": "Amazon",
+                "platform_icon": "📦"
+            })
+        except Exception as e:
+            print(f"Error extracting Amazon product: {e}")  # Debug statement
+            continue
+            
+    return products
+
+def parse_flipkart(content, max_results=10):
+    """Extract products from a Flipkart search results page"""
+    soup = BeautifulSoup(content, "lxml")
+    
+    products = []
+    items = FLIPKART_SELECTORS['items'].select(soup)[:max_results]
+    
+    for item in items:
+        try:
+            title_elem = first_match(item, FLIPKART_SELECTORS['link'])
+            title = title_elem.text.strip() if title_elem else "N/A"
+            
+            link_elem = title_elem
+            link = "https://www.flipkart.com" + link_elem["href"] if link_elem and link_elem.get("href") else "N/A"
+            
+            # Extract price
+            price_elem = FLIPKART_SELECTORS['price'].select_one(item)
+            price = 0
+            if price_elem:
+                try:
+                    price_str = price_elem.text.replace("₹", "").replace(",", "").strip()
+                    price = float(price_str)
+                except:
+                    price = 0
+            
+            # Extract rating
+            rating_elem = FLIPKART_SELECTORS['rating'].select_one(item)
+            rating = 0
+            if rating_elem:
+                try:
+                    rating = float(rating_elem.text)
+                except:
+                    rating = 0
+            
+            # Extract image
+            img_elem = first_match(item, FLIPKART_SELECTORS['image'])
+            image_url = img_elem.get("src") if img_elem else ""
+            
+            print(f"Flipkart - Title: {title}, Link: {link}, Price: {price}, Rating: {rating}, Image: {image_url}")  # Debug statement
+            
+            products.append({
+                "title": title,
+                "price": price,
+                "rating": rating,
+                "url": link,
+                "image": image_url,
+                "reviews": parse_count(FLIPKART_SELECTORS['reviews'].select_one(item)),
+                "platform": "Flipkart",
+                "platform_icon": "🛒"
+            })
+        except Exception as e:
+            print(f"Error extracting Flipkart product: {e}")  # Debug statement
+            continue
+            
+    return products
+
+def parse_myntra(content, max_results=10):
+    """Extract products from a Myntra search results page"""
+    soup = BeautifulSoup(content, "lxml")
+
+    products = []
+    items = MYNTRA_SELECTORS['items'].select(soup)[:max_results]
+
+    for item in items:
+        try:
+            brand_elem = MYNTRA_SELECTORS['brand'].select_one(item)
+            name_elem = MYNTRA_SELECTORS['name'].select_one(item)
+            title = f"{brand_elem.text.strip()} {name_elem.text.strip()}" if brand_elem and name_elem else "N/A"
+
+            link_elem = MYNTRA_SELECTORS['link'].select_one(item)
+            link = "https://www.myntra.com" + link_elem["href"] if link_elem and link_elem.get("href") else "N/A"
+
+            # Extract price
+            price_elem = MYNTRA_SELECTORS['price'].select_one(item)
+            price = 0
+            if price_elem:
+                try:
+                    price_str = price_elem.text.replace("₹", "").replace(",", "").strip()
+                    price = float(price_str)
+                except:
+                    price = 0
+
+            # Extract rating (Myntra doesn't always show ratings)
+            rating_elem = MYNTRA_SELECTORS['rating'].select_one(item)
+            rating = 0
+            if rating_elem:
+                try:
+                    rating_text = rating_elem.text.strip()
+                    rating = float(rating_text) if rating_text else 0
+                except:
+                    rating = 0
+
+            # Extract image
+            img_elem = MYNTRA_SELECTORS['image'].select_one(item)
+            image_url = img_elem.get("src") if img_elem else ""
+
+            print(f"Myntra - Title: {title}, Link: {link}, Price: {price}, Rating: {rating}, Image: {image_url}")  # Debug statement
+
+            products.append({
+                "title": title,
+                "price": price,
+                "rating": rating,
+                "url": link,
+                "image": image_url,
+                "reviews": parse_count(MYNTRA_SELECTORS['reviews'].select_one(item)),
+                "platform": "Myntra",
+                "platform_icon": "👕"
+            })
+        except Exception as e:
+            print(f"Error extracting Myntra product: {e}")  # Debug statement
+            continue
+
+    return products
+
 # ---- Multi-Platform Scrapers ----
 
-def scrape_amazon_in(search_query, max_results=10):
-    """Scrape Amazon India for products"""
+def scrape_amazon_in(search_query, max_results=10, page=1, strict=False):
+    """Scrape Amazon India for products (max_results=None keeps the whole page)
+
+    Failures return [] unless strict=True, which re-raises them.
+    """
     query = quote_plus(search_query)
     url = f"https://www.amazon.in/s?k={query}"
+    if page > 1:
+        url += f"&page={page}"
     
     try:
-        r = requests.get(url, headers=HEADERS, timeout=10)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.content, "lxml")
-        
-        products = []
-        items = soup.select("div.s-main-slot div[data-component-type='s-search-result']")[:max_results]
-        
-        for item in items:
-            try:
-                # Try multiple selectors for title - Amazon frequently changes their structure
-                title_elem = (item.select_one("h2 a span") or 
-                             item.select_one("span.a-size-base-plus") or 
-                             item.select_one("span.a-text-normal") or
-                             item.select_one("h2 span"))
-                title = title_elem.text.strip() if title_elem else "N/A"
-                
-                # Try multiple selectors for link
-                link_elem = (item.select_one("h2 a") or 
-                            item.select_one("a.a-link-normal") or
-                            item.select_one("a.a-text-normal"))
-                link = "https://www.amazon.in" + link_elem["href"] if link_elem and link_elem.get("href") else "N/A"
-                
-                # Debug: print the HTML structure to understand what's available
-                if title == "N/A":
-                    print(f"DEBUG - Item HTML: {item.prettify()[:500]}...")
-                
-                # Extract price
-                price_whole = item.select_one("span.a-price-whole")
-                price_fraction = item.select_one("span.a-price-fraction")
-                price = 0
-                if price_whole:
-                    try:
-                        price_str = price_whole.text.replace(",", "").replace("₹", "").strip()
-                        if price_fraction:
-                            price_str += "." + price_fraction.text
-                        price = float(price_str)
-                    except:
-                        price = 0
-                
-                # Extract rating
-                rating_span = item.select_one("span.a-icon-alt")
-                rating = 0
-                if rating_span:
-                    try:
-                        rating = float(rating_span.text.split()[0])
-                    except:
-                        rating = 0
-                
-                # Extract image
-                img_elem = item.select_one("img.s-image")
-                image_url = (
-                    img_elem.get("src")
-                    or img_elem.get("data-src")
-                    or img_elem.get("srcset", "").split(" ")[0]
-                    if img_elem else ""
-                )
-                
-                print(f"Amazon - Title: {title}, Link: {link}, Price: {price}, Rating: {rating}, Image: {image_url}")  # Debug statement
-                
-                products.append({
-                    "title": title,
-                    "price": price,
-                    "rating": rating,
-                    "url": link,
-                    "image": image_url,
-                    "platform": "Amazon",
-                    "platform_icon": "📦"
-                })
-            except Exception as e:
-                print(f"Error extracting Amazon product: {e}")  # Debug statement
-                continue
-                
+        with stage('fetch', platform='amazon', page=page):
+            r = fetch_page(url)
+            r.raise_for_status()
+        check_deadline("parsing")
+        with stage('parse', platform='amazon', page=page):
+            products = parse_page('amazon', r.content, max_results)
+        archive_page('amazon', search_query, page, url, r.content, products)
         return products
         
     except Exception as e:
         print(f"Amazon scraping error: {e}")
+        if strict:
+            raise
         return []
 
-def scrape_flipkart(search_query, max_results=10):
-    """Scrape Flipkart for products"""
+def scrape_flipkart(search_query, max_results=10, page=1, strict=False):
+    """Scrape Flipkart for products (max_results=None keeps the whole page)
+
+    Failures return [] unless strict=True, which re-raises them.
+    """
     query = quote_plus(search_query)
     url = f"https://www.flipkart.com/search?q={query}"
+    if page > 1:
+        url += f"&page={page}"
     
     try:
-        r = requests.get(url, headers=HEADERS, timeout=10)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.content, "lxml")
-        
-        products = []
-        items = soup.select("div._1AtVbE")[:max_results]
-        
-        for item in items:
-            try:
-                title_elem = item.select_one("a.IRpwTa") or item.select_one("a._1fQZEK")
-                title = title_elem.text.strip() if title_elem else "N/A"
-                
-                link_elem = item.select_one("a.IRpwTa") or item.select_one("a._1fQZEK")
-                link = "https://www.flipkart.com" + link_elem["href"] if link_elem and link_elem.get("href") else "N/A"
-                
-                # Extract price
-                price_elem = item.select_one("div._30jeq3")
-                price = 0
-                if price_elem:
-                    try:
-                        price_str = price_elem.text.replace("₹", "").replace(",", "").strip()
-                        price = float(price_str)
-                    except:
-                        price = 0
-                
-                # Extract rating
-                rating_elem = item.select_one("div._3LWZlK")
-                rating = 0
-                if rating_elem:
-                    try:
-                        rating = float(rating_elem.text)
-                    except:
-                        rating = 0
-                
-                # Extract image
-                img_elem = item.select_one("img._396cs4") or item.select_one("img._2r_T1I")
-                image_url = img_elem.get("src") if img_elem else ""
-                
-                print(f"Flipkart - Title: {title}, Link: {link}, Price: {price}, Rating: {rating}, Image: {image_url}")  # Debug statement
-                
-                products.append({
-                    "title": title,
-                    "price": price,
-                    "rating": rating,
-                    "url": link,
-                    "image": image_url,
-                    "platform": "Flipkart",
-                    "platform_icon": "🛒"
-                })
-            except Exception as e:
-                print(f"Error extracting Flipkart product: {e}")  # Debug statement
-                continue
-                
+        with stage('fetch', platform='flipkart', page=page):
+            r = fetch_page(url)
+            r.raise_for_status()
+        check_deadline("parsing")
+        with stage('parse', platform='flipkart', page=page):
+            products = parse_page('flipkart', r.content, max_results)
+        archive_page('flipkart', search_query, page, url, r.content, products)
         return products
         
     except Exception as e:
         print(f"⚠️ Flipkart access blocked (403 error). This is a common anti-scraping measure.")
         print(f"   Try using a different network or VPN if you need Flipkart results.")
+        if strict:
+            raise
         return []
 
-def scrape_myntra(search_query, max_results=10):
-    """Scrape Myntra for fashion products"""
+def scrape_myntra(search_query, max_results=10, page=1, strict=False):
+    """Scrape Myntra for fashion products (max_results=None keeps the whole page)
+
+    Failures return [] unless strict=True, which re-raises them.
+    """
     query = quote_plus(search_query)
     url = f"https://www.myntra.com/{search_query.replace(' ', '-')}?rawQuery={query}"
+    if page > 1:
+        url += f"&p={page}"
 
     try:
-        r = requests.get(url, headers=HEADERS, timeout=10)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.content, "lxml")
-
-        products = []
-        items = soup.select("li.product-base")[:max_results]
-
-        for item in items:
-            try:
-                brand_elem = item.select_one("h3.product-brand")
-                name_elem = item.select_one("h4.product-product")
-                title = f"{brand_elem.text.strip()} {name_elem.text.strip()}" if brand_elem and name_elem else "N/A"
-
-                link_elem = item.select_one("a[href]")
-                link = "https://www.myntra.com" + link_elem["href"] if link_elem and link_elem.get("href") else "N/A"
-
-                # Extract price
-                price_elem = item.select_one("span.product-discountedPrice, span.product-price")
-                price = 0
-                if price_elem:
-                    try:
-                        price_str = price_elem.text.replace("₹", "").replace(",", "").strip()
-                        price = float(price_str)
-                    except:
-                        price = 0
-
-                # Extract rating (Myntra doesn't always show ratings)
-                rating_elem = item.select_one("div.product-ratingsContainer")
-                rating = 0
-                if rating_elem:
-                    try:
-                        rating_text = rating_elem.text.strip()
-                        rating = float(rating_text) if rating_text else 0
-                    except:
-                        rating = 0
-
-                # Extract image
-                img_elem = item.select_one("img.img-responsive")
-                image_url = img_elem.get("src") if img_elem else ""
-
-                print(f"Myntra - Title: {title}, Link: {link}, Price: {price}, Rating: {rating}, Image: {image_url}")  # Debug statement
-
-                products.append({
-                    "title": title,
-                    "price": price,
-                    "rating": rating,
-                    "url": link,
-                    "image": image_url,
-                    "platform": "Myntra",
-                    "platform_icon": "👕"
-                })
-            except Exception as e:
-                print(f"Error extracting Myntra product: {e}")  # Debug statement
-                continue
-
+        with stage('fetch', platform='myntra', page=page):
+            r = fetch_page(url)
+            r.raise_for_status()
+        check_deadline("parsing")
+        with stage('parse', platform='myntra', page=page):
+            products = parse_page('myntra', r.content, max_results)
+        archive_page('myntra', search_query, page, url, r.content, products)
         return products
 
     except Exception as e:
         print(f"Myntra scraping error: {e}")
+        if strict:
+            raise
         return []
 
-def scrape_all_platforms(search_query, max_results=10):
-    """Scrape all available platforms"""
-    all_products = []
+FASHION_KEYWORDS = ['clothing', 'fashion', 'shirt', 'dress', 'shoes', 'accessories']
 
-    # Scrape Amazon
-    amazon_products = scrape_amazon_in(search_query, max_results)
-    all_products.extend(amazon_products)
+def platforms_for_query(search_query):
+    """Platforms scrape_all_platforms will hit for a query"""
+    platforms = ['amazon', 'flipkart']
+    if any(keyword in search_query.lower() for keyword in FASHION_KEYWORDS):
+        platforms.append('myntra')
+    return platforms
 
-    # Scrape Flipkart
-    flipkart_products = scrape_flipkart(search_query, max_results)
-    all_products.extend(flipkart_products)
+PLATFORM_PARSERS = {
+    'amazon': parse_amazon_in,
+    'flipkart': parse_flipkart,
+    'myntra': parse_myntra
+}
 
-    # Scrape Myntra (for fashion products)
-    if any(keyword in search_query.lower() for keyword in ['clothing', 'fashion', 'shirt', 'dress', 'shoes', 'accessories']):
-        myntra_products = scrape_myntra(search_query, max_results)
-        all_products.extend(myntra_products)
+PLATFORM_SCRAPERS = {
+    'amazon': scrape_amazon_in,
+    'flipkart': scrape_flipkart,
+    'myntra': scrape_myntra
+}
+
+# ---- Result Page Cache & Pagination ----
+PAGE_CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', 300))
+PAGE_CACHE_MAX_ENTRIES = 500
+# Upper bound on retailer pages fetched per platform for a single call
+MAX_PAGES_PER_CALL = 5
+
+page_cache = {}  # (platform, query, page) -> (timestamp, products)
+page_cache_lock = threading.Lock()
+
+def fetch_result_page(platform, search_query, page):
+    """All products on one retailer results page, cached so later cursors reuse it
+
+    Fetch and parse failures (HTTP errors, timeouts, rate-limit or concurrency waits) raise and
+    are not cached; only pages that were fetched and parsed are.
+    """
+    key = (platform, search_query, page)
+    now = time.time()
+    cached = page_cache.get(key)
+    if cached and now - cached[0] < PAGE_CACHE_TIMEOUT:
+        return cached[1]
+
+    products = PLATFORM_SCRAPERS[platform](search_query, None, page, strict=True)
+    if not products and expired():
+        # Cut off by the request deadline - not a genuinely empty page, so do not cache it
+        raise DeadlineExceeded(f"Request deadline passed while scraping {platform}")
+    with page_cache_lock:
+        page_cache[key] = (now, products)
+        if len(page_cache) > PAGE_CACHE_MAX_ENTRIES:
+            for stale in [k for k, v in page_cache.items() if now - v[0] >= PAGE_CACHE_TIMEOUT]:
+                del page_cache[stale]
+            # Still full of fresh pages: drop the oldest ones
+            while len(page_cache) > PAGE_CACHE_MAX_ENTRIES:
+                del page_cache[min(page_cache, key=lambda k: page_cache[k][0])]
+    return products
+
+def scrape_platform_pages(platform, search_query, max_results, position=(1, 0)):
+    """Collect up to max_results products from one platform starting at (page, offset)
+
+    Returns (products, next_position); next_position is None once the platform has no more results.
+    Stops early at the request deadline or on a failed fetch, returning the products so far and
+    where to resume.
+    """
+    page, offset = position
+    products = []
+    for _ in range(MAX_PAGES_PER_CALL):
+        if len(products) >= max_results or expired():
+            break
+        try:
+            page_items = fetch_result_page(platform, search_query, page)
+        except DeadlineExceeded:
+            break
+        except Exception:
+            # Already reported by the scraper and its fetch stage; a later cursor retries this page
+            break
+        if offset >= len(page_items):
+            return products, None  # empty (or exhausted) page - nothing further
+        taken = page_items[offset:offset + max_results - len(products)]
+        products.extend(taken)
+        offset += len(taken)
+        if offset >= len(page_items):
+            page, offset = page + 1, 0
+    return products, (page, offset)
+
+def first_page_positions(search_query):
+    """Starting (page, offset) for every platform a query is scraped from"""
+    return {platform: (1, 0) for platform in platforms_for_query(search_query)}
+
+# Called with (platform, products) as each platform finishes, for streamed searches
+result_listener = contextvars.ContextVar('result_listener', default=None)
+
+def notify_results(scrape_pages, listener):
+    """scrape_platform_pages that also hands each platform's products to listener"""
+    def run(platform, *args):
+        products, next_position = scrape_pages(platform, *args)
+        try:
+            listener(platform, products)
+        except Exception as e:
+            print(f"⚠️ Result listener failed for {platform}: {e}")
+        return products, next_position
+    return run
+
+_fanout = {}  # pid -> ThreadPoolExecutor; pool threads do not survive a fork
+
+def fanout_pool():
+    """Thread pool that scrapes platforms in parallel (AUTOTUNER bounds the fetches themselves)"""
+    pool = _fanout.get(os.getpid())
+    if pool is None:
+        _fanout.clear()
+        pool = _fanout[os.getpid()] = ThreadPoolExecutor(max_workers=AUTOTUNER.max_limit,
+                                                         thread_name_prefix='scrape')
+    return pool
+
+def scrape_all_platforms_paged(search_query, max_results=10, positions=None):
+    """Scrape max_results products per platform from the given positions, platforms in parallel
+
+    Returns (products, next_positions) where next_positions only holds platforms with more results
+    (or that the request deadline or a failed fetch cut off).
+    """
+    if positions is None:
+        positions = first_page_positions(search_query)
+
+    # Each task runs in a copy of the caller's context so its scrape priority carries over;
+    # profiled() adds the task's thread to a sampled request profile (request_profiler)
+    scrape_pages = profiled(scrape_platform_pages)
+    listener = result_listener.get()
+    if listener is not None:
+        scrape_pages = notify_results(scrape_pages, listener)
+    futures = [
+        (platform, fanout_pool().submit(contextvars.copy_context().run, scrape_pages,
+                                        platform, search_query, max_results, tuple(position)))
+        for platform, position in positions.items()
+    ]
+    all_products = []
+    next_positions = {}
+    for platform, future in futures:
+        try:
+            products, next_position = future.result(timeout=clamp_timeout(None))
+        except FutureTimeout:
+            # Deadline passed: drop the platform's late results, a cursor can resume it
+            future.cancel()
+            products, next_position = [], tuple(positions[platform])
+        except Exception as e:
+            # A bug in one platform's pipeline must not cost the other platforms' results
+            print(f"⚠️ Scraping {platform} failed: {e}")
+            record_error('platform', e, platform=platform)
+            products, next_position = [], None
+        all_products.extend(products)
+        if next_position is not None:
+            next_positions[platform] = next_position
+    return all_products, next_positions
 
+def scrape_all_platforms(search_query, max_results=10):
+    """Scrape all available platforms"""
+    # Amazon, Flipkart and (for fashion products) Myntra, following result pages until max_results
+    all_products, _ = scrape_all_platforms_paged(search_query, max_results)
     return all_products
 
 # ---- Persona Recommenders ----
@@ -269,36 +630,43 @@ def budgetbalance(products, top_n=3):
     return sorted_products[:top_n]
 
 # ---- Enhanced Persona Debate ----
-def persona_debate(products, user_pref="neutral"):
-    pm_recs = premiummax(products, 3)
-    bb_recs = budgetbalance(products, 3)
+def describe_product(p):
+    """One-line summary of a product for the console (tolerates missing fields)"""
+    title = str(p.get('title') or 'N/A')[:50]
+    return (f"{title}... | ₹{p.get('price', 0)} | ⭐{p.get('rating', 0)} | "
+            f"{p.get('platform_icon', '')} {p.get('platform', '')}")
+
+def persona_debate(products, user_pref="neutral", ranking=None):
+    # An existing PersonaRanking of the same products skips re-filtering and re-sorting
+    if ranking is None:
+        ranking = PersonaRanking(products, top_n=3)
+    pm_recs = ranking.top('premium', 3)
+    bb_recs = ranking.top('budget', 3)
 
     print(f"\n🤖 PremiumMax (High-End Expert) found {len(pm_recs)} recommendations:")
     for i, p in enumerate(pm_recs, 1):
-        print(f"   {i}. 🏆 {p['title'][:50]}... | ₹{p['price']} | ⭐{p['rating']} | {p['platform_icon']} {p['platform']}")
+        print(f"   {i}. 🏆 {describe_product(p)}")
 
     print(f"\n🤖 BudgetBalance (Smart Saver) found {len(bb_recs)} recommendations:")
     for i, p in enumerate(bb_recs, 1):
-        print(f"   {i}. 💰 {p['title'][:50]}... | ₹{p['price']} | ⭐{p['rating']} | {p['platform_icon']} {p['platform']}")
+        print(f"   {i}. 💰 {describe_product(p)}")
 
     # Conflict Resolution
-    if user_pref == "premium":
-        final = pm_recs[0] if pm_recs else (products[0] if products else None)
-        print(f"\n✅ Final Decision: PremiumMax wins! Best quality product from {final['platform']}")
-        return final
+    final = ranking.final(user_pref)
+    if final is None:
+        print("\n❌ No product to recommend")
+    elif user_pref == "premium":
+        print(f"\n✅ Final Decision: PremiumMax wins! Best quality product from {final.get('platform')}")
     elif user_pref == "budget":
-        final = bb_recs[0] if bb_recs else (products[0] if products else None)
-        print(f"\n✅ Final Decision: BudgetBalance wins! Best value from {final['platform']}")
-        return final
-    else:
+        print(f"\n✅ Final Decision: BudgetBalance wins! Best value from {final.get('platform')}")
+    elif ranking.persona_for(user_pref) != 'value':
+        # Other declared personas (see persona_scoring)
+        label = ranking.personas.labels[ranking.persona_for(user_pref)]
+        print(f"\n✅ Final Decision: {label} wins! Pick from {final.get('platform')}")
+    elif (final.get('price') or 0) > 0 and (final.get('rating') or 0) > 0:
         # Best value-for-money across all platforms
-        filtered = [p for p in products if p['price'] > 0 and p['rating'] > 0]
-        if filtered:
-            best = sorted(filtered, key=lambda x: (x['rating'] / (x['price'] + 1)), reverse=True)[0]
-            print(f"\n✅ Final Decision: Best value for money from {best['platform']}")
-            return best
-        else:
-            return products[0] if products else None
+        print(f"\n✅ Final Decision: Best value for money from {final.get('platform')}")
+    return final
 
 # ---- Enhanced Demo Function ----
 def run_enhanced_demo():
@@ -313,14 +681,22 @@ def run_enhanced_demo():
     
     print(f"\n🌐 Searching across Amazon, Flipkart, and Myntra...")
     
-    results = scrape_all_platforms(search, 5)
+    # Same pipeline as the web app (cache, catalog, dedup, ranking); the persona debate is
+    # printed as part of it. Imported here because search_service imports this module lazily.
+    import search_service
+    try:
+        response = search_service.search({'search_query': search, 'max_results': 5, 'preference': pref})
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    results = response.get('data') or []
     
     if results:
         print(f"\n✅ Found {len(results)} products across platforms:")
         for i, product in enumerate(results, 1):
             print(f"   {i}. {product['platform_icon']} {product['platform']}: {product['title'][:40]}... - ₹{product['price']}")
         
-        final_choice = persona_debate(results, pref)
+        final_choice = response.get('final_recommendation')
         
         if final_choice:
             print(f"\n🎯 FINAL RECOMMENDATION:")